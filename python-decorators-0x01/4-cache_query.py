@@ -1,20 +1,38 @@
+import os
 import time
 import sqlite3
+import inspect
 import functools
-import hashlib
+from cache_engine import (ANY_TABLE, MISSING, QueryCache, SharedCache,
+                          SingleFlight, cache_key, track_tables)
 
-# Global cache dictionary
-query_cache = {}
+# Global query cache: least recently used results are evicted beyond 1024
+# entries or 64 MB, and results expire after 5 minutes. Set QUERY_CACHE_FILE
+# to a path to share a second cache tier between processes on this host.
+shared_path = os.environ.get('QUERY_CACHE_FILE')
+query_cache = QueryCache(
+    max_entries=1024, max_bytes=64 * 1024 * 1024, ttl=300,
+    shared=SharedCache(shared_path, ttl=300) if shared_path else None)
+
+# Misses being loaded right now, shared with concurrent callers of the same key
+in_flight = SingleFlight()
 
 def with_db_connection(func):
-    """Decorator that handles database connections."""
+    """
+    Decorator that handles database connections.
+    Tables written on the connection are evicted from query_cache afterwards.
+    """
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
         conn = None
         try:
             conn = sqlite3.connect('users.db')
             if 'conn' not in kwargs and not (args and isinstance(args[0], sqlite3.Connection)):
-                return func(conn, *args, **kwargs)
+                with track_tables(conn) as usage:
+                    try:
+                        return func(conn, *args, **kwargs)
+                    finally:
+                        query_cache.invalidate(usage.writes)
             return func(*args, **kwargs)
         except sqlite3.Error as e:
             print(f"Database error: {e}")
@@ -24,25 +42,81 @@ def with_db_connection(func):
                 conn.close()
     return wrapper
 
+def transactional(func):
+    """
+    Decorator that manages database transactions.
+    Commits if the function completes successfully, rolls back on exception.
+    After a commit, cached results that read the tables written are evicted.
+    """
+    @functools.wraps(func)
+    def wrapper(conn, *args, **kwargs):
+        try:
+            with track_tables(conn) as usage:
+                result = func(conn, *args, **kwargs)
+            conn.commit()
+            query_cache.invalidate(usage.writes)
+            return result
+        except Exception as e:
+            conn.rollback()
+            print(f"Transaction failed, rolling back: {e}")
+            raise
+    return wrapper
+
 def cache_query(func):
     """
-    Decorator that caches query results based on the SQL query string.
-    Uses SHA-256 hash of the query as the cache key.
+    Decorator that caches query results in query_cache.
+    The cache key is the normalised query text plus any bound parameters
+    passed after it, so the same query with different parameters is cached
+    separately. Each result remembers the tables it read, so writes to
+    those tables evict it.
+    Concurrent misses on the same key run the query once: the other callers
+    wait for that result (or its exception). Works on coroutine functions
+    too; their tables are not tracked, so any tracked write evicts them.
     """
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(conn, query, *args, **kwargs):
+            key = cache_key(query, (args, kwargs))
+            result = query_cache.lookup(key)
+            if result is not MISSING:
+                print("Returning cached result")
+                return result
+
+            async def load():
+                since = query_cache.version()
+                result = await func(conn, query, *args, **kwargs)
+                query_cache.store(key, result, (ANY_TABLE,), since)
+                print("Caching new result")
+                return result
+
+            result, shared = await in_flight.do_async(key, load)
+            if shared:
+                print("Returning result shared with a concurrent call")
+            return result
+        return async_wrapper
+
     @functools.wraps(func)
     def wrapper(conn, query, *args, **kwargs):
-        # Create a consistent cache key by hashing the query
-        cache_key = hashlib.sha256(query.encode()).hexdigest()
+        key = cache_key(query, (args, kwargs))
         
         # Check if result is already cached
-        if cache_key in query_cache:
+        result = query_cache.lookup(key)
+        if result is not MISSING:
             print("Returning cached result")
-            return query_cache[cache_key]
+            return result
         
-        # Execute and cache if not in cache
-        result = func(conn, query, *args, **kwargs)
-        query_cache[cache_key] = result
-        print("Caching new result")
+        # Execute and cache if not in cache, once for concurrent callers
+        def load():
+            since = query_cache.version()
+            with track_tables(conn) as usage:
+                result = func(conn, query, *args, **kwargs)
+            query_cache.store(key, result, usage.reads, since)
+            print("Caching new result")
+            return result
+
+        result, shared = in_flight.do(key, load)
+        if shared:
+            print("Returning result shared with a concurrent call")
         return result
     return wrapper
 
@@ -53,6 +127,13 @@ def fetch_users_with_cache(conn, query):
     cursor.execute(query)
     return cursor.fetchall()
 
+@with_db_connection
+@transactional
+def update_user_email(conn, user_id, new_email):
+    cursor = conn.cursor()
+    cursor.execute("UPDATE users SET email = ? WHERE id = ?", (new_email, user_id))
+    return cursor.rowcount
+
 # First call will cache the result
 print("First call:")
 users = fetch_users_with_cache(query="SELECT * FROM users")
@@ -62,4 +143,9 @@ print("\nSecond call:")
 users_again = fetch_users_with_cache(query="SELECT * FROM users")
 
 # Verify same results
-assert users == users_again
\ No newline at end of file
+assert users == users_again
+
+# An update evicts the cached result, so the next call reads fresh data
+print("\nAfter update:")
+update_user_email(user_id=1, new_email='Crawford_Cartwright@hotmail.com')
+users_updated = fetch_users_with_cache(query="SELECT * FROM users")
\ No newline at end of file
@@ -0,0 +1,86 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import functools
+
+from connection_pool import ConnectionPool, with_db_connection
+
+
+def connect_per_call(database):
+    """The connect-per-call decorator of 1-with_db_connection.py, for comparison."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            conn = sqlite3.connect(database)
+            try:
+                return func(conn, *args, **kwargs)
+            finally:
+                conn.close()
+        return wrapper
+    return decorator
+
+
+def get_user_by_id(conn, user_id):
+    cursor = conn.cursor()
+    cursor.execute("SELECT * FROM users WHERE id = ?", (user_id,))
+    return cursor.fetchone()
+
+
+def create_database(path, rows=1000):
+    """Create a users table like users.db's, with rows rows."""
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT, "
+                 "email TEXT, age INTEGER)")
+    conn.executemany("INSERT INTO users VALUES (?, ?, ?, ?)", (
+        (i, f"User {i}", f"user{i}@example.com", 18 + i % 80)
+        for i in range(1, rows + 1)))
+    conn.commit()
+    conn.close()
+
+
+def calls_per_sec(func, threads=1, seconds=1.0):
+    """Call func(user_id=...) from threads threads for seconds; return calls/sec."""
+    counts = [0] * threads
+    stop = time.perf_counter() + seconds
+
+    def work(index):
+        calls = 0
+        while time.perf_counter() < stop:
+            func(user_id=calls % 1000 + 1)
+            calls += 1
+        counts[index] = calls
+
+    workers = [threading.Thread(target=work, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return sum(counts) / (time.perf_counter() - start)
+
+
+def main(seconds=1.0):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'users.db')
+        create_database(path)
+        checkout = ConnectionPool(path, min_size=1, max_size=4)
+        per_thread = ConnectionPool(path, min_size=0, max_size=4, per_thread=True)
+        variants = [
+            ('connect per call', connect_per_call(path)(get_user_by_id)),
+            ('pool (checkout)', with_db_connection(pool=checkout)(get_user_by_id)),
+            ('pool (per thread)', with_db_connection(pool=per_thread)(get_user_by_id)),
+        ]
+        print(f"{'variant':>18} {'threads':>8} {'calls/sec':>12}")
+        for threads in (1, 4):
+            for name, func in variants:
+                rate = calls_per_sec(func, threads, seconds)
+                print(f"{name:>18} {threads:>8} {rate:>12.0f}")
+        checkout.close()
+        per_thread.close()
+
+
+if __name__ == "__main__":
+    main(*(float(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,640 @@
+import os
+import re
+import sys
+import zlib
+import pickle
+import asyncio
+import sqlite3
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# String literals and quoted identifiers (kept exactly as written) and
+# comments (dropped), matched in one pass so that a quote inside a comment or
+# a comment marker inside a string is not mistaken for the other.
+_TOKEN = re.compile(
+    r"""(?P<quoted>'(?:[^']|'')*'|"(?:[^"]|"")*"|`[^`]*`)|--[^\n]*|/\*.*?\*/""",
+    re.S)
+_SPACE = re.compile(r"\s+")
+_PUNCTUATION = re.compile(r" ?([(),;=<>!+*/%-]) ?")
+
+MISSING = object()
+# Table name for results whose tables are unknown: any write evicts them.
+ANY_TABLE = '*'
+
+# Authorizer actions that modify a table (ALTER TABLE names it in arg2).
+_WRITES = (sqlite3.SQLITE_INSERT, sqlite3.SQLITE_UPDATE, sqlite3.SQLITE_DELETE,
+           sqlite3.SQLITE_DROP_TABLE)
+
+
+def fingerprint(query):
+    """
+    Normalise SQL text so that formatting does not change the cache key:
+    - Comments are removed and runs of whitespace collapsed
+    - Keywords and names are lower-cased; quoted strings are left alone
+    - A trailing semicolon is dropped
+    """
+    parts = []
+    code = ''
+    position = 0
+    for match in _TOKEN.finditer(query):
+        code += query[position:match.start()]
+        position = match.end()
+        if match.group('quoted') is None:
+            code += ' '  # A comment separates tokens like whitespace.
+        else:
+            parts += [_normalise(code), match.group('quoted')]
+            code = ''
+    parts.append(_normalise(code + query[position:]))
+    return ''.join(parts).strip().rstrip(';').strip()
+
+
+def _normalise(code):
+    """Collapse whitespace and lower-case SQL text outside quotes."""
+    code = _SPACE.sub(' ', code).lower()
+    return _PUNCTUATION.sub(r'\1', code)
+
+
+def _freeze(value):
+    """Turn bound parameters into a stable, hashable representation."""
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return (type(value).__name__, value)
+
+
+def cache_key(query, params=()):
+    """Return the cache key of a query: its fingerprint plus its parameters."""
+    text = f"{fingerprint(query)}\0{_freeze(params)!r}"
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def estimate_size(value):
+    """Approximate bytes held by a query result (rows of plain values)."""
+    size = sys.getsizeof(value)
+    if isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item) for item in value)
+    elif isinstance(value, dict):
+        size += sum(estimate_size(key) + estimate_size(item)
+                    for key, item in value.items())
+    return size
+
+
+class TableUsage:
+    """Tables read and written by the statements of a tracked block."""
+
+    def __init__(self):
+        self.reads = set()
+        self.writes = set()
+
+
+_usages = {}  # id(connection) -> TableUsage objects of the open blocks
+_usages_lock = threading.Lock()
+
+
+def _authorize(usages, action, arg1, arg2, db_name, trigger):
+    if action == sqlite3.SQLITE_READ:
+        table, kind = arg1, 'reads'
+    elif action in _WRITES:
+        table, kind = arg1, 'writes'
+    elif action == sqlite3.SQLITE_ALTER_TABLE:
+        table, kind = arg2, 'writes'
+    else:
+        return sqlite3.SQLITE_OK
+    if table and not table.startswith('sqlite_'):
+        for usage in usages:
+            getattr(usage, kind).add(table.lower())
+    return sqlite3.SQLITE_OK
+
+
+@contextmanager
+def track_tables(conn):
+    """
+    Record the tables that statements run on conn inside the block read and
+    write, using SQLite's authorizer hook:
+        with track_tables(conn) as usage: ...; usage.reads, usage.writes
+    Blocks may nest. Installing the authorizer makes SQLite prepare cached
+    statements again, so those are seen too.
+    """
+    usage = TableUsage()
+    with _usages_lock:
+        usages = _usages.setdefault(id(conn), [])
+        usages.append(usage)
+    conn.set_authorizer(lambda *args: _authorize(usages, *args))
+    try:
+        yield usage
+    finally:
+        with _usages_lock:
+            usages.remove(usage)
+            if not usages:
+                del _usages[id(conn)]
+        if not usages:
+            conn.set_authorizer(None)
+
+
+class QueryCache:
+    """
+    Bounded, thread-safe cache of query results.
+    - Keys are the query fingerprint plus the bound parameters
+    - Least recently used entries are evicted past max_entries or max_bytes
+    - Entries older than ttl seconds are treated as misses (ttl=None: no expiry)
+    - Entries record the tables they read; invalidate(tables) evicts the
+      entries that read any of them (and those stored with ANY_TABLE)
+    - stats() reports hits, misses, evictions and current size
+    - shared (a SharedCache) adds a second tier shared by the processes on
+      the host: misses fall through to it, stores and invalidations go to
+      both tiers, and invalidations made by other processes are applied here
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024, ttl=300,
+                 clock=time.monotonic, shared=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.clock = clock
+        self.shared = shared
+        self._entries = OrderedDict()  # key -> (value, size, expires at, tables)
+        self._by_table = {}  # table -> keys of the entries that read it
+        self._bytes = 0
+        # Bumped by every invalidation; _invalidated_at maps a table to the
+        # version at which it was last invalidated.
+        self._version = 0
+        self._invalidated_at = {}
+        self._lock = threading.Lock()
+        self._stats = dict(hits=0, misses=0, evictions=0, expirations=0,
+                           rejected=0, invalidations=0, shared_hits=0)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return self.lookup(key, count=False) is not MISSING
+
+    def _drop(self, key):
+        _, size, _, tables = self._entries.pop(key)
+        self._bytes -= size
+        for table in tables:
+            keys = self._by_table[table]
+            keys.discard(key)
+            if not keys:
+                del self._by_table[table]
+
+    def _sync(self):
+        """Apply the invalidations other processes made in the shared tier."""
+        if self.shared is not None:
+            tables = self.shared.poll()
+            if tables:
+                self._invalidate_local(tables)
+
+    def lookup(self, key, count=True):
+        """Return the value cached under key, or MISSING."""
+        self._sync()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] is not None and entry[2] <= self.clock():
+                self._drop(key)
+                self._stats['expirations'] += 1
+                entry = None
+            if entry is not None:
+                if count:
+                    self._stats['hits'] += 1
+                self._entries.move_to_end(key)
+                return entry[0]
+            since = self._version
+        found = self.shared.lookup(key) if self.shared is not None else MISSING
+        if found is MISSING:
+            if count:
+                with self._lock:
+                    self._stats['misses'] += 1
+            return MISSING
+        value, tables, expires = found
+        ttl = None if expires is None else expires - time.time()
+        self._store_local(key, value, tables, since, ttl)
+        if count:
+            with self._lock:
+                self._stats['hits'] += 1
+                self._stats['shared_hits'] += 1
+        return value
+
+    def version(self):
+        """Return an invalidation token; pass it to store() as since."""
+        self._sync()
+        with self._lock:
+            local = self._version
+        return local, (self.shared.version() if self.shared is not None else None)
+
+    def store(self, key, value, tables=(), since=None):
+        """
+        Cache value under key, evicting old entries to stay within bounds.
+        tables are the tables the result was read from. With since (the
+        version() taken before the query ran) the value is not stored if
+        one of those tables was invalidated while the query was running.
+        """
+        local_since, shared_since = since if since is not None else (None, None)
+        self._sync()
+        if not self._store_local(key, value, tables, local_since, self.ttl):
+            return False
+        if self.shared is not None:
+            self.shared.store(key, value, tables, shared_since)
+        return True
+
+    def _store_local(self, key, value, tables, since, ttl):
+        size = estimate_size(value)
+        tables = frozenset(tables)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            if since is not None and any(
+                    self._invalidated_at.get(table, 0) > since for table in tables):
+                return False
+            if size > self.max_bytes:
+                self._stats['rejected'] += 1
+                return False
+            expires = self.clock() + ttl if ttl is not None else None
+            self._entries[key] = (value, size, expires, tables)
+            self._bytes += size
+            for table in tables:
+                self._by_table.setdefault(table, set()).add(key)
+            while (len(self._entries) > self.max_entries
+                   or self._bytes > self.max_bytes):
+                self._drop(next(iter(self._entries)))
+                self._stats['evictions'] += 1
+            return True
+
+    def get(self, query, params=(), default=None):
+        """Return the cached result of query with params, or default."""
+        value = self.lookup(cache_key(query, params))
+        return default if value is MISSING else value
+
+    def set(self, query, params, value, tables=()):
+        """Cache the result of query with params, read from tables."""
+        return self.store(cache_key(query, params), value, tables)
+
+    def invalidate(self, tables):
+        """Evict every entry that read one of tables; return how many."""
+        tables = {table.lower() for table in tables}
+        if not tables:
+            return 0
+        tables.add(ANY_TABLE)
+        if self.shared is not None:
+            self.shared.invalidate(tables)
+        return self._invalidate_local(tables)
+
+    def _invalidate_local(self, tables):
+        with self._lock:
+            self._version += 1
+            dropped = 0
+            for table in tables:
+                self._invalidated_at[table] = self._version
+                for key in list(self._by_table.get(table, ())):
+                    self._drop(key)
+                    dropped += 1
+            self._stats['invalidations'] += dropped
+            return dropped
+
+    def discard(self, key):
+        """Remove one entry, if present."""
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+
+    def clear(self):
+        """Remove every entry (from the shared tier too)."""
+        with self._lock:
+            self._entries.clear()
+            self._by_table.clear()
+            self._bytes = 0
+        if self.shared is not None:
+            self.shared.clear()
+
+    def stats(self):
+        """Return counters plus the current number of entries and bytes."""
+        with self._lock:
+            stats = dict(self._stats, entries=len(self._entries), bytes=self._bytes)
+        if self.shared is not None:
+            stats['shared'] = self.shared.stats()
+        return stats
+
+
+# Values pickled to at least this many bytes are stored zlib-compressed.
+COMPRESS_MIN = 1024
+
+
+def dumps(value):
+    """Serialise a result compactly: pickle, compressed when large."""
+    data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+    if len(data) >= COMPRESS_MIN:
+        return b'z' + zlib.compress(data, 1)
+    return b'p' + data
+
+
+def loads(blob):
+    """Inverse of dumps()."""
+    data = blob[1:]
+    if blob[:1] == b'z':
+        data = zlib.decompress(data)
+    return pickle.loads(data)
+
+
+_SHARED_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    expires REAL,
+    used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_entries_used ON cache_entries (used);
+CREATE INDEX IF NOT EXISTS cache_entries_expires ON cache_entries (expires);
+CREATE TABLE IF NOT EXISTS cache_tables (
+    name TEXT NOT NULL,
+    key TEXT NOT NULL,
+    PRIMARY KEY (name, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS cache_tables_key ON cache_tables (key);
+CREATE TABLE IF NOT EXISTS cache_invalidations (
+    name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS cache_totals (entries INTEGER, bytes INTEGER);
+INSERT INTO cache_totals SELECT 0, 0 WHERE NOT EXISTS (SELECT 1 FROM cache_totals);
+CREATE TRIGGER IF NOT EXISTS cache_entries_added AFTER INSERT ON cache_entries
+BEGIN
+    UPDATE cache_totals SET entries = entries + 1, bytes = bytes + NEW.size;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_entries_removed AFTER DELETE ON cache_entries
+BEGIN
+    UPDATE cache_totals SET entries = entries - 1, bytes = bytes - OLD.size;
+    DELETE FROM cache_tables WHERE key = OLD.key;
+END;
+"""
+_LATEST_VERSION = "SELECT COALESCE(MAX(version), 0) FROM cache_invalidations"
+
+
+class SharedCache:
+    """
+    Cache tier kept in a SQLite file, shared by the processes on one host
+    and surviving restarts, so new workers start warm.
+    - Values are stored pickled (zlib-compressed when large)
+    - Same rules as QueryCache: LRU past max_entries or max_bytes (of
+      stored data), ttl expiry and invalidation by table
+    - Invalidations are versioned in the file; poll() returns the tables
+      other processes invalidated since the last call
+    """
+
+    def __init__(self, path='query_cache.db', max_entries=100000,
+                 max_bytes=256 * 1024 * 1024, ttl=300):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stats = dict(hits=0, misses=0, evictions=0, expirations=0,
+                           invalidations=0)
+        # Latest invalidation applied; read when the file is first opened.
+        self._seen = None
+        # Connections inherited through fork(): kept referenced so that they
+        # are never closed (or otherwise used) in the child.
+        self._inherited = []
+
+    def _conn(self):
+        """
+        Return this thread's connection to the cache file. The file is only
+        opened on first use, and a forked child (a worker started from a
+        preloaded app) opens its own rather than reusing its parent's.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid != os.getpid():
+            self._inherited.append(conn)
+            conn = None
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SHARED_SCHEMA)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+            self._local.data_version = None
+            with self._lock:
+                if self._seen is None:
+                    self._seen = conn.execute(_LATEST_VERSION).fetchone()[0]
+        return conn
+
+    @contextmanager
+    def _write(self):
+        """Run the block in one write transaction."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._stats[name] += amount
+
+    def version(self):
+        """Return the number of the latest invalidation."""
+        return self._conn().execute(_LATEST_VERSION).fetchone()[0]
+
+    def poll(self):
+        """Return the tables invalidated since the last poll(), if any."""
+        conn = self._conn()
+        # data_version only changes when another connection commits.
+        data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == self._local.data_version:
+            return ()
+        self._local.data_version = data_version
+        with self._lock:
+            seen = self._seen
+        rows = conn.execute(
+            "SELECT name, version FROM cache_invalidations WHERE version > ?",
+            (seen,)).fetchall()
+        if not rows:
+            return ()
+        with self._lock:
+            self._seen = max(self._seen, max(version for _, version in rows))
+        return {name for name, _ in rows}
+
+    def lookup(self, key):
+        """Return (value, tables, expires at) for key, or MISSING."""
+        conn = self._conn()
+        row = conn.execute("SELECT value, expires FROM cache_entries WHERE key = ?",
+                           (key,)).fetchone()
+        now = time.time()
+        if row is not None and row[1] is not None and row[1] <= now:
+            conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+            self._count('expirations')
+            row = None
+        if row is None:
+            self._count('misses')
+            return MISSING
+        conn.execute("UPDATE cache_entries SET used = ? WHERE key = ?", (now, key))
+        tables = [name for (name,) in conn.execute(
+            "SELECT name FROM cache_tables WHERE key = ?", (key,))]
+        self._count('hits')
+        return loads(row[0]), tables, row[1]
+
+    def store(self, key, value, tables=(), since=None):
+        """
+        Cache value under key for all processes. With since (a version()
+        taken before the query ran) nothing is stored if one of tables was
+        invalidated in the meantime.
+        """
+        blob = dumps(value)
+        if len(blob) > self.max_bytes:
+            return False
+        tables = sorted(set(tables))
+        now = time.time()
+        expires = now + self.ttl if self.ttl is not None else None
+        with self._write() as conn:
+            if since is not None and tables:
+                marks = ', '.join('?' * len(tables))
+                if conn.execute(
+                        "SELECT 1 FROM cache_invalidations "
+                        f"WHERE version > ? AND name IN ({marks}) LIMIT 1",
+                        (since, *tables)).fetchone():
+                    return False
+            conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+            conn.execute("INSERT INTO cache_entries VALUES (?, ?, ?, ?, ?)",
+                         (key, blob, len(blob), expires, now))
+            conn.executemany("INSERT INTO cache_tables VALUES (?, ?)",
+                             [(table, key) for table in tables])
+            self._evict(conn, now)
+        return True
+
+    def _evict(self, conn, now):
+        """Drop expired entries, then the least recently used past the limits."""
+        conn.execute("DELETE FROM cache_entries WHERE expires <= ?", (now,))
+        while True:
+            entries, size = conn.execute(
+                "SELECT entries, bytes FROM cache_totals").fetchone()
+            if entries <= self.max_entries and size <= self.max_bytes:
+                return
+            excess = max(entries - self.max_entries, 1)
+            cursor = conn.execute(
+                "DELETE FROM cache_entries WHERE key IN (SELECT key FROM "
+                "cache_entries ORDER BY used LIMIT ?)", (excess,))
+            self._count('evictions', cursor.rowcount)
+
+    def invalidate(self, tables):
+        """Evict, for every process, the entries that read one of tables."""
+        tables = sorted({table.lower() for table in tables} | {ANY_TABLE})
+        marks = ', '.join('?' * len(tables))
+        with self._write() as conn:
+            version = conn.execute(
+                "SELECT COALESCE(MAX(version), 0) + 1 FROM cache_invalidations"
+            ).fetchone()[0]
+            conn.executemany("INSERT OR REPLACE INTO cache_invalidations VALUES (?, ?)",
+                             [(table, version) for table in tables])
+            cursor = conn.execute(
+                "DELETE FROM cache_entries WHERE key IN (SELECT key FROM "
+                f"cache_tables WHERE name IN ({marks}))", tables)
+        with self._lock:
+            # Our own invalidation need not come back from poll().
+            if version == self._seen + 1:
+                self._seen = version
+        self._count('invalidations', cursor.rowcount)
+        return cursor.rowcount
+
+    def clear(self):
+        """Remove every entry."""
+        with self._write() as conn:
+            conn.execute("DELETE FROM cache_entries")
+
+    def stats(self):
+        """Return this process's counters plus the file's entries and bytes."""
+        entries, size = self._conn().execute(
+            "SELECT entries, bytes FROM cache_totals").fetchone()
+        with self._lock:
+            return dict(self._stats, entries=entries, bytes=size)
+
+
+class _Call:
+    """One in-flight execution whose outcome is shared with its waiters."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key:
+    - The first caller (the leader) runs the function
+    - Callers arriving while it runs wait and get the same result, or the
+      same exception if it failed
+    - do() serves threads, do_async() coroutines of one event loop
+    - If a do_async() leader is cancelled, its waiters are not: one of them
+      runs the function as the new leader
+    Both return (result, shared), shared being True for the waiters.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func):
+        """Run func() once for all threads asking for key at the same time."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+        try:
+            call.result = func()
+            return call.result, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def do_async(self, key, coro_func):
+        """Await coro_func() once for all coroutines asking for key at once."""
+        loop = asyncio.get_running_loop()
+        key = (loop, key)
+        while key in self._futures:
+            future = self._futures[key]
+            try:
+                # shield: a cancelled waiter must not cancel the leader's call.
+                return await asyncio.shield(future), True
+            except asyncio.CancelledError:
+                # Only the leader was cancelled: try again, possibly as the
+                # new leader. Our own cancellation is passed on.
+                task = asyncio.current_task()
+                if not future.cancelled() or getattr(task, 'cancelling', int)():
+                    raise
+        future = loop.create_future()
+        # Mark the outcome as retrieved even if nobody else was waiting.
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._futures[key] = future
+        try:
+            result = await coro_func()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            del self._futures[key]
@@ -0,0 +1,195 @@
+import sqlite3
+import functools
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+
+class PoolTimeout(sqlite3.OperationalError):
+    """Raised when no connection becomes free within the pool's timeout."""
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of sqlite3 connections to one database file.
+    - At most max_size connections are open; acquire() waits up to timeout
+      seconds for one to come back when all are in use
+    - min_size connections are opened up front and kept open; idle ones
+      above that are closed after idle_timeout seconds
+    - per_thread=False (checkout): a connection belongs to a caller from
+      acquire() to release() and can then go to any thread
+    - per_thread=True: each thread keeps its own connection, reused across
+      calls and closed when the thread ends
+    - Connections are validated (SELECT 1) on checkout and any open
+      transaction is rolled back on return
+    """
+
+    def __init__(self, database='users.db', min_size=1, max_size=5,
+                 per_thread=False, timeout=30, idle_timeout=60, **connect_kwargs):
+        if not 0 <= min_size <= max_size:
+            raise ValueError("Need 0 <= min_size <= max_size")
+        self.database = database
+        self.min_size = min_size
+        self.max_size = max_size
+        self.per_thread = per_thread
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.connect_kwargs = dict(connect_kwargs, check_same_thread=False)
+        self._idle = []  # (connection, returned at), most recent last
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._local = threading.local()
+        self._closed = False
+        for _ in range(min_size):
+            self._idle.append((self._connect(), time.monotonic()))
+
+    def _connect(self):
+        return sqlite3.connect(self.database, **self.connect_kwargs)
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def _checkout(self):
+        """Take an idle connection or open one; it holds a slot until checkin."""
+        if self._closed:
+            raise sqlite3.ProgrammingError("Connection pool is closed")
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolTimeout(f"No connection available after {self.timeout}s "
+                              f"(pool size {self.max_size})")
+        while True:
+            with self._lock:
+                conn = self._idle.pop()[0] if self._idle else None
+            if conn is None:
+                try:
+                    return self._connect()
+                except BaseException:
+                    self._slots.release()
+                    raise
+            try:
+                conn.execute("SELECT 1").fetchone()
+                return conn
+            except sqlite3.Error:
+                # Broken connection: drop it and try the next one.
+                self._close(conn)
+
+    def _checkin(self, conn):
+        """Reset a connection and keep it idle, or close it if it is broken."""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._close(conn)
+            self._slots.release()
+            return
+        now = time.monotonic()
+        expired = []
+        with self._lock:
+            if self._closed:
+                expired.append(conn)
+            else:
+                self._idle.append((conn, now))
+            # Close the longest-idle connections beyond min_size.
+            while (len(self._idle) > self.min_size
+                   and now - self._idle[0][1] > self.idle_timeout):
+                expired.append(self._idle.pop(0)[0])
+        self._slots.release()
+        for old in expired:
+            self._close(old)
+
+    def acquire(self):
+        """Return a healthy connection; give it back with release()."""
+        if not self.per_thread:
+            return self._checkout()
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            try:
+                conn.execute("SELECT 1").fetchone()
+                return conn
+            except sqlite3.Error:
+                self._drop_local(conn)
+        conn = self._checkout()
+        self._local.conn = conn
+        # Hand the connection back once its thread is gone.
+        self._local.finalizer = weakref.finalize(
+            threading.current_thread(), self._checkin, conn)
+        return conn
+
+    def _drop_local(self, conn):
+        """Close the calling thread's broken connection and free its slot."""
+        # The thread no longer owns conn, so it must not be checked in again
+        # when the thread ends.
+        self._local.finalizer.detach()
+        self._local.conn = self._local.finalizer = None
+        self._close(conn)
+        self._slots.release()
+
+    def release(self, conn):
+        """Give back a connection from acquire()."""
+        if not self.per_thread:
+            self._checkin(conn)
+            return
+        # The thread keeps its connection; just end any open transaction.
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._drop_local(conn)
+
+    @contextmanager
+    def connection(self):
+        """Context manager: with pool.connection() as conn: ..."""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        """Close the idle connections; ones in use are closed on return."""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            self._close(conn)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(database='users.db', **options):
+    """Return the shared pool for database, creating it on first use."""
+    with _pools_lock:
+        pool = _pools.get(database)
+        if pool is None:
+            pool = _pools[database] = ConnectionPool(database, **options)
+        return pool
+
+
+def with_db_connection(func=None, pool=None):
+    """
+    Pooled version of with_db_connection:
+    - Borrows a connection from pool (the shared users.db pool by default)
+    - Passes it to the decorated function unless one was given
+    - Rolls back anything left uncommitted and returns the connection
+    Use as @with_db_connection or @with_db_connection(pool=...).
+    """
+    if func is None:
+        return functools.partial(with_db_connection, pool=pool)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if 'conn' in kwargs or (args and isinstance(args[0], sqlite3.Connection)):
+            return func(*args, **kwargs)
+        try:
+            with (pool or get_pool()).connection() as conn:
+                return func(conn, *args, **kwargs)
+        except sqlite3.Error as e:
+            print(f"Database error: {e}")
+            raise
+    return wrapper
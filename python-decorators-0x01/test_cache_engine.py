@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Unit tests for cache_engine.py:
+- fingerprint and cache_key normalisation
+- SingleFlight.do_async coalescing and cancellation
+"""
+
+import asyncio
+import unittest
+from cache_engine import SingleFlight, cache_key, fingerprint
+
+
+class TestFingerprint(unittest.TestCase):
+    """Test cases for fingerprint and cache_key"""
+
+    def test_formatting_does_not_change_fingerprint(self):
+        """Test that case, spacing, comments and a final ';' are ignored"""
+        self.assertEqual(
+            fingerprint("SELECT *\n  FROM users -- all of them\n WHERE id = ?;"),
+            fingerprint("select * from users where id=?"))
+
+    def test_quoted_strings_are_kept(self):
+        """Test that string literals keep their case and spacing"""
+        self.assertEqual(
+            fingerprint("SELECT * FROM users WHERE name = 'Ann  Lee'"),
+            "select*from users where name='Ann  Lee'")
+
+    def test_quote_inside_comment(self):
+        """Test that a quote in a comment does not start a string literal"""
+        for comment in ("-- user's lookup\n", "/* user's lookup */ "):
+            with self.subTest(comment=comment):
+                self.assertNotEqual(
+                    cache_key(comment + "SELECT * FROM users WHERE name = 'Ann'"),
+                    cache_key(comment + "SELECT * FROM users WHERE name = 'ANN'"))
+                self.assertEqual(
+                    fingerprint(comment + "SELECT * FROM users WHERE name = 'Ann'"),
+                    "select*from users where name='Ann'")
+
+    def test_comment_marker_inside_string(self):
+        """Test that '--' and '/*' inside a string literal are kept"""
+        self.assertEqual(
+            fingerprint("SELECT * FROM users WHERE note = '-- /* x */' AND id = 1"),
+            "select*from users where note='-- /* x */' and id=1")
+
+    def test_parameters_change_cache_key(self):
+        """Test that the same query with other parameters has another key"""
+        query = "SELECT * FROM users WHERE id = ?"
+        self.assertNotEqual(cache_key(query, (1,)), cache_key(query, (2,)))
+        self.assertNotEqual(cache_key(query, (1,)), cache_key(query, ('1',)))
+
+
+class TestSingleFlightAsync(unittest.TestCase):
+    """Test cases for SingleFlight.do_async"""
+
+    def run_calls(self, leader_timeout=None, cancel_waiter=False):
+        """Start a leader and a waiter for one key; return results and calls"""
+        flight = SingleFlight()
+        calls = []
+
+        async def load():
+            calls.append(1)
+            await asyncio.sleep(0.1)
+            return 'rows'
+
+        async def main():
+            leader = asyncio.create_task(
+                asyncio.wait_for(flight.do_async('key', load), leader_timeout))
+            await asyncio.sleep(0)
+            waiter = asyncio.create_task(flight.do_async('key', load))
+            await asyncio.sleep(0.01)
+            if cancel_waiter:
+                waiter.cancel()
+            return await asyncio.gather(leader, waiter, return_exceptions=True)
+
+        return asyncio.run(main()), len(calls)
+
+    def test_waiter_shares_result(self):
+        """Test that a concurrent caller gets the leader's result"""
+        results, calls = self.run_calls()
+        self.assertEqual(results, [('rows', False), ('rows', True)])
+        self.assertEqual(calls, 1)
+
+    def test_leader_cancelled(self):
+        """Test that a waiter takes over when the leader is cancelled"""
+        results, calls = self.run_calls(leader_timeout=0.05)
+        self.assertIsInstance(results[0], asyncio.TimeoutError)
+        self.assertEqual(results[1], ('rows', False))
+        self.assertEqual(calls, 2)
+
+    def test_waiter_cancelled(self):
+        """Test that cancelling a waiter leaves the leader running"""
+        results, calls = self.run_calls(cancel_waiter=True)
+        self.assertEqual(results[0], ('rows', False))
+        self.assertIsInstance(results[1], asyncio.CancelledError)
+        self.assertEqual(calls, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
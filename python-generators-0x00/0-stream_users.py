@@ -1,23 +1,36 @@
 import mysql.connector
+import seed
+from compact_rows import iter_rows, make_cursor, wrap_rows
 
-def stream_users():
-    """Generator to stream rows one by one from the user_data table."""
+def stream_users(array_size=None, row_mode='dict'):
+    """Generator to stream rows one by one from the user_data table.
+
+    With array_size set, rows are read through an unbuffered cursor that
+    leaves the result set on the server and pulls it array_size rows at a
+    time with fetchmany(), so memory use stays flat however big the table is.
+
+    row_mode='tuple' yields compact namedtuple rows (row.email, row.age)
+    instead of dicts.
+    """
     try:
-        conn = mysql.connector.connect(
-            host='localhost',
-            user='root',
-            password='',  # Change this if needed
-            database='ALX_prodev'
-        )
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM user_data")
+        with seed.pooled_connection() as conn:
+            if array_size is None:
+                cursor = make_cursor(conn, row_mode)
+                cursor.execute("SELECT * FROM user_data")
 
-        # Single loop to yield each row one by one
-        for row in cursor:
-            yield row
+                # Single loop to yield each row one by one
+                for row in iter_rows(cursor, row_mode):
+                    yield row
+            else:
+                cursor = make_cursor(conn, row_mode, buffered=False)
+                cursor.execute("SELECT * FROM user_data")
+                while True:
+                    rows = cursor.fetchmany(array_size)
+                    if not rows:
+                        break
+                    yield from wrap_rows(cursor, rows, row_mode)
 
-        cursor.close()
-        conn.close()
+            cursor.close()
 
     except mysql.connector.Error as err:
         print(f"Error: {err}")
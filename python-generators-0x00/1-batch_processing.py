@@ -1,37 +1,120 @@
+import time
+
 import mysql.connector
+import seed
+from adaptive import batch_bytes
+from checkpoint import resumable
+from columnar import ColumnBatch
+from keys import decode_rows
+from prefetch import prefetched
+from query import col, select_sql
+
+def stream_users_in_batches(batch_size, keyset=False, columns=None, where=None,
+                            prefetch=0, columnar=False, after=None,
+                            checkpoint=None, adaptive=None, raise_errors=False):
+    """Generator that fetches rows from user_data in batches of batch_size.
+
+    With keyset=True each batch is fetched with WHERE user_id > last_seen
+    instead of OFFSET, which keeps the cost of every batch constant and stays
+    correct while rows are being inserted.
+
+    columns limits the SELECT list and where (a query.Predicate such as
+    col('age') > 25) is compiled into the WHERE clause, so only the needed
+    rows and columns are sent by the server. In keyset mode user_id is always
+    selected since it is the paging key.
+
+    With prefetch=N a background thread fetches up to N batches ahead while
+    the caller processes the current one.
 
-def stream_users_in_batches(batch_size):
-    """Generator that fetches rows from user_data in batches of batch_size."""
+    With columnar=True each batch is a columnar.ColumnBatch (one compact
+    column per field) instead of a list of dicts.
+
+    In keyset mode after=user_id starts the scan past that key. With
+    checkpoint=path the scan is resumable: the last user_id of each consumed
+    batch is saved to path and a restarted job continues from it (keyset
+    mode is implied).
+
+    With adaptive=adaptive.AdaptiveBatchSize(...) batch_size is only the
+    first batch's size: each later size is chosen from the measured fetch
+    latency and bytes per row, under the sizer's memory_limit. The sizes
+    picked and the throughput are available from the sizer's stats().
+
+    A database error is printed and ends the stream, unless raise_errors is
+    True, in which case it propagates to the caller. Either way a checkpoint
+    is kept, so a failed job resumes from its last consumed batch.
+    """
+    if checkpoint:
+        try:
+            yield from resumable(
+                lambda after: stream_users_in_batches(
+                    batch_size, True, columns, where, prefetch, columnar, after,
+                    adaptive=adaptive, raise_errors=True),
+                checkpoint)
+        except mysql.connector.Error as err:
+            if raise_errors:
+                raise
+            print(f"Error: {err}")
+        return
+    if prefetch:
+        if adaptive:
+            # The batch being fetched, the queued ones and the consumer's.
+            adaptive.in_flight = prefetch + 2
+        yield from prefetched(
+            stream_users_in_batches(batch_size, keyset, columns, where,
+                                    columnar=columnar, after=after,
+                                    adaptive=adaptive, raise_errors=raise_errors),
+            prefetch)
+        return
     try:
-        conn = mysql.connector.connect(
-            host='localhost',
-            user='root',
-            password='',  # adjust if needed
-            database='ALX_prodev'
-        )
-        cursor = conn.cursor(dictionary=True)
-        offset = 0
-
-        while True:
-            cursor.execute(
-                "SELECT * FROM user_data ORDER BY user_id LIMIT %s OFFSET %s",
-                (batch_size, offset)
-            batch = cursor.fetchall()
-            if not batch:
-                cursor.close()
-                conn.close()
-                return  # Explicit return when done
-            yield batch
-            offset += batch_size
+        with seed.pooled_connection() as conn:
+            cursor = conn.cursor(dictionary=not columnar)
+            binary_keys = seed.binary_keys(conn)
+            offset = 0
+            last_user_id = after
+
+            while True:
+                size = adaptive.next_size(batch_size) if adaptive else batch_size
+                started = time.perf_counter()
+                if keyset:
+                    sql, params = select_sql(columns, where, after=last_user_id,
+                                             keyset=True, limit=size,
+                                             binary_keys=binary_keys)
+                else:
+                    sql, params = select_sql(columns, where, limit=size,
+                                             offset=offset,
+                                             binary_keys=binary_keys)
+                cursor.execute(sql, params)
+                batch = decode_rows(cursor.fetchall(), cursor.column_names)
+                if adaptive:
+                    adaptive.record(len(batch), time.perf_counter() - started,
+                                    batch_bytes(batch))
+                if not batch:
+                    cursor.close()
+                    return  # Explicit return when done
+                if columnar:
+                    if keyset:
+                        key_index = cursor.column_names.index('user_id')
+                        last_user_id = batch[-1][key_index]
+                    yield ColumnBatch.from_rows(cursor.column_names, batch)
+                else:
+                    if keyset:
+                        last_user_id = batch[-1]['user_id']
+                    yield batch
+                offset += size
 
     except mysql.connector.Error as err:
+        if raise_errors:
+            raise
         print(f"Error: {err}")
         return  
 
-def batch_processing(batch_size):
-    """Process batches by filtering users with age > 25, yield filtered users."""
-    for batch in stream_users_in_batches(batch_size):
+def batch_processing(batch_size, columns=None):
+    """Process batches by filtering users with age > 25, yield filtered users.
+
+    The age filter runs in the database, so younger users are never fetched.
+    """
+    for batch in stream_users_in_batches(batch_size, keyset=True,
+                                         columns=columns, where=col('age') > 25):
         for user in batch:
-            if user['age'] > 25:
-                yield user
+            yield user
     return 
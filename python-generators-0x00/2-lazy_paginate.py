@@ -1,21 +1,80 @@
 import seed
+from checkpoint import resumable
+from compact_rows import field, make_cursor, wrap_rows
+from prefetch import prefetched
 
-def paginate_users(page_size, offset):
+def paginate_users(page_size, offset, row_mode='dict'):
     """Fetch a page of users from the database."""
-    connection = seed.connect_to_prodev()
-    cursor = connection.cursor(dictionary=True)
-    cursor.execute(f"SELECT * FROM user_data LIMIT {page_size} OFFSET {offset}")
-    rows = cursor.fetchall()
-    cursor.close()
-    connection.close()
+    with seed.pooled_connection() as connection:
+        cursor = make_cursor(connection, row_mode)
+        cursor.execute(
+            "SELECT * FROM user_data ORDER BY user_id LIMIT %s OFFSET %s",
+            (page_size, offset)
+        )
+        rows = wrap_rows(cursor, cursor.fetchall(), row_mode)
+        cursor.close()
     return rows
 
-def lazy_pagination(page_size):
-    """Generator that lazily fetches pages of users with given page_size."""
+def paginate_users_after(page_size, last_user_id=None, row_mode='dict'):
+    """Fetch the page of users whose user_id follows last_user_id.
+
+    Keyset (seek) pagination: the primary key index is used to jump straight
+    to the first row of the page, so every page costs the same no matter how
+    deep into the table it is.
+    """
+    with seed.pooled_connection() as connection:
+        cursor = make_cursor(connection, row_mode)
+        if last_user_id is None:
+            cursor.execute(
+                "SELECT * FROM user_data ORDER BY user_id LIMIT %s",
+                (page_size,)
+            )
+        else:
+            cursor.execute(
+                "SELECT * FROM user_data WHERE user_id > %s ORDER BY user_id LIMIT %s",
+                (seed.key_param(last_user_id, connection), page_size)
+            )
+        rows = wrap_rows(cursor, cursor.fetchall(), row_mode)
+        cursor.close()
+    return rows
+
+def lazy_pagination(page_size, keyset=False, prefetch=0, row_mode='dict',
+                    after=None, checkpoint=None):
+    """Generator that lazily fetches pages of users with given page_size.
+
+    With keyset=True each page continues from the last user_id seen instead of
+    an OFFSET, so rows inserted concurrently never shift the page boundaries
+    (no row is skipped or yielded twice).
+
+    With prefetch=N a background thread fetches up to N pages ahead while
+    the caller processes the current one.
+
+    row_mode='tuple' yields pages of compact namedtuple rows instead of dicts.
+
+    In keyset mode after=user_id starts past that key. With checkpoint=path
+    the last user_id of each consumed page is saved to path and a restarted
+    job resumes from it (keyset mode is implied).
+    """
+    if checkpoint:
+        yield from resumable(
+            lambda after: lazy_pagination(page_size, True, prefetch, row_mode,
+                                          after),
+            checkpoint)
+        return
+    if prefetch:
+        yield from prefetched(
+            lazy_pagination(page_size, keyset, row_mode=row_mode, after=after),
+            prefetch)
+        return
     offset = 0
+    last_user_id = after
     while True:
-        page = paginate_users(page_size, offset)
+        if keyset:
+            page = paginate_users_after(page_size, last_user_id, row_mode)
+        else:
+            page = paginate_users(page_size, offset, row_mode)
         if not page:
             break
         yield page
         offset += page_size
+        last_user_id = field(page[-1], 'user_id')
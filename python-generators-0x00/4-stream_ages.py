@@ -1,14 +1,86 @@
+import math
+
 import seed
+from operator import itemgetter
+from streaming_stats import StreamStats
 
 def stream_user_ages():
     """Generator that yields user ages one by one from the database."""
-    connection = seed.connect_to_prodev()
-    cursor = connection.cursor(dictionary=True)
-    cursor.execute("SELECT age FROM user_data")
-    for row in cursor:
-        yield row['age']
-    cursor.close()
-    connection.close()
+    with seed.pooled_connection() as connection:
+        cursor = connection.cursor()
+        cursor.execute("SELECT age FROM user_data")
+        for (age,) in cursor:
+            yield age
+        cursor.close()
+
+def stream_user_age_batches(batch_size=10000):
+    """Generator that yields lists of user ages (as floats), batch_size at a time."""
+    with seed.pooled_connection() as connection:
+        cursor = connection.cursor(buffered=False)
+        cursor.execute("SELECT age FROM user_data")
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield list(map(float, map(itemgetter(0), rows)))
+        cursor.close()
+
+def age_statistics(batch_size=10000, bin_width=10, pushdown=False):
+    """Summarise user ages in one pass and constant memory.
+
+    Returns count, mean, variance, stddev, min, max, a histogram of
+    bin_width-wide bins and quantiles. By default ages are streamed in
+    batches and quantiles are t-digest estimates; with pushdown=True the
+    database computes everything exactly and only the results are fetched.
+    """
+    if pushdown:
+        return sql_age_statistics(bin_width)
+    stats = StreamStats(bin_width=bin_width)
+    for ages in stream_user_age_batches(batch_size):
+        stats.update(ages)
+    return stats.summary()
+
+def sql_age_statistics(bin_width=10, quantiles=(0.25, 0.5, 0.75, 0.9, 0.99)):
+    """Compute the age_statistics() summary exactly with SQL aggregates."""
+    with seed.pooled_connection() as connection:
+        cursor = connection.cursor()
+        cursor.execute(
+            "SELECT COUNT(age), AVG(age), VAR_POP(age), MIN(age), MAX(age) "
+            "FROM user_data"
+        )
+        count, mean, variance, low, high = cursor.fetchone()
+        cursor.execute(
+            "SELECT FLOOR(age / %s) * %s AS bin, COUNT(*) FROM user_data "
+            "GROUP BY bin ORDER BY bin",
+            (bin_width, bin_width)
+        )
+        histogram = {float(bin_start): n for bin_start, n in cursor.fetchall()}
+        exact = {}
+        for q in quantiles:
+            if not count:
+                exact[q] = float('nan')
+                continue
+            # Nearest-rank quantile (the ceil(q * count)-th smallest age),
+            # read straight off the sorted ages. Rounding first keeps float
+            # noise such as 0.07 * 100 = 7.000000000000001 from adding a rank.
+            rank = math.ceil(round(q * count, 9))
+            cursor.execute(
+                "SELECT age FROM user_data ORDER BY age LIMIT 1 OFFSET %s",
+                (max(rank - 1, 0),)
+            )
+            exact[q] = float(cursor.fetchone()[0])
+        cursor.close()
+    nan = float('nan')
+    return {
+        'count': count,
+        'mean': float(mean) if count else nan,
+        'variance': float(variance) if count else nan,
+        'stddev': float(variance) ** 0.5 if count else nan,
+        'min': float(low) if count else nan,
+        'max': float(high) if count else nan,
+        'histogram': histogram,
+        'quantiles': exact,
+    }
 
 def calculate_average_age():
     """Calculate average age using the stream_user_ages generator."""
@@ -0,0 +1,106 @@
+"""Batch sizes that adapt to how the previous batches went.
+
+A fixed batch size is a guess: tiny batches spend their time on round
+trips, huge ones hold a lot of rows in memory at once. AdaptiveBatchSize
+measures every fetch (rows, seconds, bytes) and picks the next size so a
+fetch takes about target_latency seconds, without a batch growing past
+memory_limit bytes. Pass one to stream_users_in_batches(adaptive=...) and
+read its stats() afterwards.
+"""
+import sys
+from collections import deque
+
+# Smoothing factor for the moving averages: weight of the newest sample.
+ALPHA = 0.3
+
+
+def row_bytes(row):
+    """Estimate the memory held by one fetched row (a dict or a tuple)."""
+    values = row.values() if isinstance(row, dict) else row
+    return sys.getsizeof(row) + sum(sys.getsizeof(value) for value in values)
+
+
+def batch_bytes(batch):
+    """Estimate the memory held by a batch from a few sample rows."""
+    if hasattr(batch, 'nbytes'):
+        return batch.nbytes
+    if not batch:
+        return 0
+    samples = {0, len(batch) // 2, len(batch) - 1}
+    per_row = sum(row_bytes(batch[i]) for i in samples) / len(samples)
+    return int(per_row * len(batch))
+
+
+def _smooth(average, sample):
+    return sample if average is None else average + ALPHA * (sample - average)
+
+
+class AdaptiveBatchSize:
+    """Chooses batch sizes from measured fetch latency and bytes per row.
+
+    Each size is min_size <= size <= max_size, grows by at most `growth`
+    times per batch and, with memory_limit set, is capped so that
+    size * bytes_per_row stays under memory_limit divided by the number of
+    batches alive at once (see in_flight).
+    """
+
+    def __init__(self, target_latency=0.05, memory_limit=None, min_size=100,
+                 max_size=100000, growth=2.0, history=1000):
+        self.target_latency = target_latency
+        self.memory_limit = memory_limit
+        self.min_size = min_size
+        self.max_size = max_size
+        self.growth = growth
+        # Batches alive at the same time, e.g. prefetch depth + 2.
+        self.in_flight = 1
+        self.size = None
+        self.seconds_per_row = None
+        self.bytes_per_row = None
+        self.batches = 0
+        self.rows = 0
+        self.seconds = 0.0
+        self.sizes = deque(maxlen=history)
+
+    def clamp(self, size):
+        size = max(self.min_size, min(self.max_size, int(size)))
+        if self.memory_limit and self.bytes_per_row:
+            ceiling = self.memory_limit / self.in_flight / self.bytes_per_row
+            size = min(size, max(1, int(ceiling)))
+        return size
+
+    def next_size(self, initial):
+        """Return the size of the next batch; `initial` is used for the first."""
+        if self.size is None:
+            self.size = self.clamp(initial)
+        return self.size
+
+    def record(self, rows, seconds, nbytes):
+        """Account for a fetch of `rows` rows taking `seconds` and `nbytes`."""
+        self.batches += 1
+        self.rows += rows
+        self.seconds += seconds
+        self.sizes.append(self.size)
+        if not rows:
+            return
+        self.seconds_per_row = _smooth(self.seconds_per_row, seconds / rows)
+        self.bytes_per_row = _smooth(self.bytes_per_row, nbytes / rows)
+        if self.seconds_per_row:
+            wanted = self.target_latency / self.seconds_per_row
+        else:
+            wanted = self.max_size
+        self.size = self.clamp(min(wanted, self.size * self.growth))
+
+    def stats(self):
+        """Return the sizes chosen so far and the measured throughput."""
+        return {
+            'batches': self.batches,
+            'rows': self.rows,
+            'fetch_seconds': self.seconds,
+            'rows_per_sec': self.rows / self.seconds if self.seconds else None,
+            'bytes_per_row': self.bytes_per_row,
+            'fetch_latency': (self.seconds_per_row * self.size
+                              if self.seconds_per_row else None),
+            'current_size': self.size,
+            'sizes': list(self.sizes),
+        }
+
@@ -0,0 +1,40 @@
+"""Time how long importing the generator modules takes.
+
+Each module is imported in a fresh interpreter, `repeat` times, and the
+median wall time is reported. Importing seed used to connect to MySQL and
+re-load user_data.csv; run this before and after such a change to compare.
+
+Usage: python bench_import.py [repeat]
+"""
+import statistics
+import subprocess
+import sys
+import time
+
+MODULES = ('seed', '0-stream_users', '1-batch_processing', '2-lazy_paginate',
+           '4-stream_ages')
+
+
+def import_seconds(module, repeat=5):
+    """Return the median seconds to start Python and import module."""
+    code = f"__import__({module!r})"
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], check=True,
+                       stdout=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main(repeat=5):
+    baseline = import_seconds('sys', repeat)
+    print(f"{'module':>20} {'import ms':>10}")
+    print(f"{'(interpreter)':>20} {baseline * 1000:>10.1f}")
+    for module in MODULES:
+        seconds = import_seconds(module, repeat) - baseline
+        print(f"{module:>20} {seconds * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,61 @@
+"""Measure the peak RSS of stream_users with and without streaming mode.
+
+Each mode runs in a fresh interpreter so that its peak RSS is its own. Load
+user_data at the size you want to measure (e.g. 1M or 10M rows) first, or
+pass --rows N to replace its contents with N synthetic rows.
+
+Usage: python bench_memory.py [--rows N] [array_size ...]
+"""
+import json
+import resource
+import subprocess
+import sys
+import time
+
+
+def run_child(array_size):
+    """Stream the whole table once and print rows, seconds and peak RSS."""
+    stream_users = __import__('0-stream_users').stream_users
+    start = time.perf_counter()
+    rows = 0
+    for _ in stream_users(array_size):
+        rows += 1
+    print(json.dumps({
+        'rows': rows,
+        'seconds': time.perf_counter() - start,
+        # ru_maxrss is reported in kilobytes on Linux
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }))
+
+
+def measure(array_size):
+    """Run one mode in a child interpreter and return its report."""
+    output = subprocess.run(
+        [sys.executable, __file__, '--child', str(array_size)],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(array_sizes=(1000, 10000)):
+    print(f"{'mode':>16} {'rows':>10} {'seconds':>9} {'peak RSS MB':>12}")
+    for array_size in (None,) + tuple(array_sizes):
+        report = measure(array_size)
+        mode = 'default' if array_size is None else f"stream({array_size})"
+        print(f"{mode:>16} {report['rows']:>10} {report['seconds']:>9.2f} "
+              f"{report['peak_rss_mb']:>12.1f}")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ['--child']:
+        run_child(None if sys.argv[2] == 'None' else int(sys.argv[2]))
+    else:
+        args = sys.argv[1:]
+        if args[:1] == ['--rows']:
+            from synthetic_data import load_database
+            load_database(int(args[1]), truncate=True)
+            args = args[2:]
+        if args:
+            main([int(arg) for arg in args])
+        else:
+            main()
@@ -0,0 +1,59 @@
+"""Compare the latency of fetching page N with OFFSET and keyset pagination.
+
+Usage: python bench_pagination.py [page_size] [page ...]
+"""
+import sys
+import time
+
+import seed
+
+lazy_paginate = __import__('2-lazy_paginate')
+
+
+def user_id_before(page_size, page):
+    """Return the last user_id of the page preceding `page` (None for page 0)."""
+    if page == 0:
+        return None
+    with seed.pooled_connection() as connection:
+        cursor = connection.cursor()
+        cursor.execute(
+            "SELECT user_id FROM user_data ORDER BY user_id LIMIT 1 OFFSET %s",
+            (page * page_size - 1,)
+        )
+        row = cursor.fetchone()
+        cursor.close()
+    return row[0] if row else None
+
+
+def best_of(func, repeat=5):
+    """Return the fastest of `repeat` timed calls of func, in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def main(page_size=100, pages=(0, 10, 100, 1000, 10000)):
+    print(f"{'page':>8} {'offset ms':>12} {'keyset ms':>12}")
+    for page in pages:
+        last_user_id = user_id_before(page_size, page)
+        if page and last_user_id is None:
+            print(f"{page:>8} {'(past end of table)':>25}")
+            continue
+        offset_ms = best_of(
+            lambda: lazy_paginate.paginate_users(page_size, page * page_size))
+        keyset_ms = best_of(
+            lambda: lazy_paginate.paginate_users_after(page_size, last_user_id))
+        print(f"{page:>8} {offset_ms:>12.2f} {keyset_ms:>12.2f}")
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:]]
+    if len(args) > 1:
+        main(args[0], args[1:])
+    elif args:
+        main(args[0])
+    else:
+        main()
@@ -0,0 +1,74 @@
+"""Micro-benchmark of dict rows against compact tuple rows.
+
+Builds rows the way each cursor mode does and reports heap blocks and
+bytes retained per row plus rows/sec. With --db the same comparison runs
+against stream_users() on the live user_data table.
+
+Usage: python bench_rows.py [rows] [--db]
+"""
+import sys
+import time
+import tracemalloc
+import uuid
+
+from compact_rows import row_class
+
+COLUMNS = ('user_id', 'name', 'email', 'age')
+
+
+def sample_rows(count):
+    """Return tuples shaped like the rows a plain cursor returns."""
+    return [
+        (str(uuid.uuid4()), f"User {i}", f"user{i}@example.com", i % 100)
+        for i in range(count)
+    ]
+
+
+def as_dicts(rows):
+    # What the dictionary cursor does for every row.
+    return [dict(zip(COLUMNS, row)) for row in rows]
+
+
+def as_tuples(rows):
+    return list(map(row_class(COLUMNS)._make, rows))
+
+
+def measure(build, rows):
+    """Return (blocks per row, bytes per row, rows/sec) for one row mode."""
+    before = sys.getallocatedblocks()
+    tracemalloc.start()
+    built = build(rows)
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    blocks = sys.getallocatedblocks() - before
+    del built
+
+    start = time.perf_counter()
+    build(rows)
+    elapsed = time.perf_counter() - start
+    return blocks / len(rows), retained / len(rows), len(rows) / elapsed
+
+
+def measure_db():
+    """Time a full stream_users() scan in each row mode."""
+    stream_users = __import__('0-stream_users').stream_users
+    for row_mode in ('dict', 'tuple'):
+        start = time.perf_counter()
+        count = sum(1 for _ in stream_users(10000, row_mode=row_mode))
+        elapsed = time.perf_counter() - start
+        print(f"{row_mode:>6} {count:>10} rows {count / elapsed:>12.0f} rows/sec")
+
+
+def main(count=200000):
+    rows = sample_rows(count)
+    print(f"{'mode':>6} {'blocks/row':>11} {'bytes/row':>10} {'rows/sec':>12}")
+    for name, build in (('dict', as_dicts), ('tuple', as_tuples)):
+        blocks, size, rate = measure(build, rows)
+        print(f"{name:>6} {blocks:>11.2f} {size:>10.1f} {rate:>12.0f}")
+
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if arg != '--db']
+    main(*(int(arg) for arg in args))
+    if '--db' in sys.argv:
+        measure_db()
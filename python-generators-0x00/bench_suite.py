@@ -0,0 +1,188 @@
+"""Repeatable benchmark of the user_data streaming generators.
+
+For every table size the suite reloads user_data with synthetic rows, then
+runs each generator at each batch size in a fresh interpreter and records
+rows/sec, time to first row, peak RSS and round trips (statements executed
+by the server, read from the global Questions counter less the pool's own
+ROLLBACKs, so run it against a quiet local MySQL/MariaDB instance). Results
+are written as JSON so runs can be compared to catch regressions.
+
+Usage: python bench_suite.py [--sizes N ...] [--batch-sizes N ...]
+                             [--output results.json] [--no-seed]
+"""
+import argparse
+import json
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+import seed
+from synthetic_data import load_database
+
+# OFFSET pagination is quadratic; skip it on tables bigger than this.
+OFFSET_MAX_ROWS = 100000
+
+
+def load_table(rows):
+    """Replace the contents of user_data with `rows` synthetic rows."""
+    load_database(rows, truncate=True)
+
+
+def questions():
+    """Return the server's global count of statements executed."""
+    with seed.pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SHOW GLOBAL STATUS LIKE 'Questions'")
+        value = int(cursor.fetchone()[1])
+        cursor.close()
+    return value
+
+
+def make_generator(case):
+    """Return the generator for a case, plus whether it yields batches."""
+    name = case['generator']
+    size = case['batch_size']
+    if name == 'stream_users':
+        return __import__('0-stream_users').stream_users(size), False
+    if name == 'stream_users_in_batches':
+        module = __import__('1-batch_processing')
+        return module.stream_users_in_batches(size, keyset=case['keyset']), True
+    if name == 'lazy_pagination':
+        module = __import__('2-lazy_paginate')
+        return module.lazy_pagination(size, keyset=case['keyset']), True
+    if name == 'stream_user_ages':
+        return __import__('4-stream_ages').stream_user_ages(), False
+    raise ValueError(f"Unknown generator: {name}")
+
+
+def count_releases(pool):
+    """Count the connections handed back to pool; return a one-item list."""
+    releases = [0]
+    release = pool.release
+
+    def counted(conn):
+        releases[0] += 1
+        release(conn)
+
+    pool.release = counted
+    return releases
+
+
+def run_case(case):
+    """Drain one generator and return its measurements."""
+    # Warm the pool and the key format lookup so neither connection setup
+    # nor the schema query is charged to the generator.
+    seed.binary_keys()
+    releases = count_releases(seed.get_pool())
+    questions_before = questions()
+    generator, batched = make_generator(case)
+    rows = 0
+    first_row = None
+    start = time.perf_counter()
+    for item in generator:
+        if first_row is None:
+            first_row = time.perf_counter() - start
+        rows += len(item) if batched else 1
+    elapsed = time.perf_counter() - start
+    questions_after = questions()
+    # Not the generator's: our second SHOW STATUS, and the ROLLBACK the pool
+    # sends for every connection handed back, except for the last release
+    # (the second questions() call's), which runs after the count was read.
+    round_trips = questions_after - questions_before - 1 - (releases[0] - 1)
+    return dict(
+        case,
+        rows=rows,
+        seconds=elapsed,
+        rows_per_sec=rows / elapsed if elapsed else None,
+        time_to_first_row=first_row,
+        # ru_maxrss is reported in kilobytes on Linux
+        peak_rss_mb=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        round_trips=round_trips,
+    )
+
+
+def measure(case):
+    """Run a case in a fresh interpreter so its peak RSS is its own."""
+    output = subprocess.run(
+        [sys.executable, __file__, '--child', json.dumps(case)],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def cases(table_rows, batch_sizes):
+    """Return the cases to run against a table of table_rows rows."""
+    result = [{'generator': 'stream_users', 'batch_size': None},
+              {'generator': 'stream_user_ages', 'batch_size': None}]
+    for size in batch_sizes:
+        result.append({'generator': 'stream_users', 'batch_size': size})
+        for name in ('stream_users_in_batches', 'lazy_pagination'):
+            result.append({'generator': name, 'batch_size': size, 'keyset': True})
+            if table_rows <= OFFSET_MAX_ROWS:
+                result.append({'generator': name, 'batch_size': size,
+                               'keyset': False})
+    return result
+
+
+def count_rows():
+    with seed.pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM user_data")
+        count = cursor.fetchone()[0]
+        cursor.close()
+    return count
+
+
+def server_version():
+    with seed.pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT VERSION()")
+        version = cursor.fetchone()[0]
+        cursor.close()
+    return version
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[10000, 1000000, 10000000])
+    parser.add_argument('--batch-sizes', type=int, nargs='+',
+                        default=[100, 1000, 10000])
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--no-seed', action='store_true',
+                        help="benchmark the table as it is (one size)")
+    args = parser.parse_args()
+
+    report = {
+        'started': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'server': server_version(),
+        'results': [],
+    }
+    sizes = [count_rows()] if args.no_seed else args.sizes
+    for table_rows in sizes:
+        if not args.no_seed:
+            print(f"Loading {table_rows} rows...")
+            load_table(table_rows)
+        for case in cases(table_rows, args.batch_sizes):
+            case['table_rows'] = table_rows
+            result = measure(case)
+            report['results'].append(result)
+            print(f"{result['generator']:>24} batch={result['batch_size']!s:>6} "
+                  f"keyset={result.get('keyset')!s:>5} "
+                  f"{result['rows_per_sec'] or 0:>12.0f} rows/s "
+                  f"first={result['time_to_first_row'] or 0:.4f}s "
+                  f"rss={result['peak_rss_mb']:.1f}MB "
+                  f"trips={result['round_trips']}")
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ['--child']:
+        print(json.dumps(run_case(json.loads(sys.argv[2]))))
+    else:
+        main()
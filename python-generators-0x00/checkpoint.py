@@ -0,0 +1,115 @@
+"""Durable resume tokens for long user_data scans.
+
+A checkpoint is a small JSON file holding the last key a job finished
+with. It is rewritten atomically (temp file, fsync, rename) so a crash
+never leaves a torn token behind. Tokens are saved only once the consumer
+asks for the next batch, so every batch is processed at least once.
+"""
+import json
+import os
+
+import seed
+from compact_rows import field
+from keys import decode_rows
+from query import Key, Predicate, col, select_sql
+
+
+def load_checkpoint(path):
+    """Return the saved checkpoint state, or {} if there is none."""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_checkpoint(path, state):
+    """Atomically replace the checkpoint at path with state."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def clear_checkpoint(path):
+    """Remove the checkpoint at path, if any."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def last_value(batch, name):
+    """Return column `name` of the last row of a list-of-rows or ColumnBatch."""
+    if hasattr(batch, 'columns'):
+        return batch[name][-1]
+    return field(batch[-1], name)
+
+
+def resumable(make_batches, path):
+    """Generator that runs a keyset scan from its saved resume token.
+
+    make_batches(after) must return a generator of batches ordered by
+    user_id that starts after the given user_id (None for the beginning),
+    and must raise rather than stop early when the scan fails. The last
+    user_id of each batch is saved to path once the batch has been consumed;
+    the checkpoint is removed only when the scan runs to its end, so the
+    next run starts from the beginning again.
+    """
+    batches = make_batches(load_checkpoint(path).get('last_user_id'))
+    try:
+        for batch in batches:
+            yield batch
+            save_checkpoint(path, {'last_user_id': last_value(batch, 'user_id')})
+    finally:
+        batches.close()
+    clear_checkpoint(path)
+
+
+def changed_since(updated_at, user_id):
+    """Predicate for rows after (updated_at, user_id) in change order."""
+    return Predicate(
+        "(updated_at > %s OR (updated_at = %s AND user_id > %s))",
+        (updated_at, updated_at, Key(user_id)))
+
+
+def stream_changed_users(batch_size, path, columns=None, where=None, lag=1):
+    """Generator of batches of rows inserted or updated since the checkpoint.
+
+    Rows are read in (updated_at, user_id) order and the position of the
+    last consumed batch is kept in the checkpoint at path, which is never
+    removed: the next run (or a restart after a crash) carries on from
+    there. With no checkpoint the whole table is streamed. Rows changed in
+    the last `lag` seconds are left for the next run so that transactions
+    still committing when the scan starts are not skipped.
+    """
+    state = load_checkpoint(path)
+    order_by = ('updated_at', 'user_id')
+    with seed.pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT NOW(6) - INTERVAL %s SECOND", (lag,))
+        until = cursor.fetchone()[0]
+        cursor.close()
+
+        cursor = conn.cursor(dictionary=True)
+        position = (state.get('updated_at'), state.get('user_id'))
+        while True:
+            predicate = col('updated_at') < until
+            if position[0] is not None:
+                predicate = predicate & changed_since(*position)
+            if where is not None:
+                predicate = predicate & where
+            sql, params = select_sql(columns, predicate, keyset=True,
+                                     limit=batch_size, order_by=order_by,
+                                     binary_keys=seed.binary_keys(conn))
+            cursor.execute(sql, params)
+            batch = decode_rows(cursor.fetchall(), cursor.column_names)
+            if not batch:
+                break
+            yield batch
+            position = (str(batch[-1]['updated_at']), batch[-1]['user_id'])
+            save_checkpoint(path, {'updated_at': position[0],
+                                   'user_id': position[1]})
+        cursor.close()
@@ -0,0 +1,169 @@
+"""Column-oriented batches of user_data rows.
+
+A ColumnBatch keeps one compact column per field instead of one dict per
+row: numbers live in an array('d') and strings are packed into a single
+UTF-8 buffer with an array of offsets, so a batch costs a few Python
+objects rather than several per row. Columns can be filtered and
+aggregated with builtins (sum(), itertools.compress()) or handed to NumPy.
+"""
+import uuid
+from array import array
+from itertools import accumulate, compress
+
+NUMERIC_COLUMNS = ('age',)
+
+
+def typecode(column):
+    """Return the item type of a numeric column (array or memoryview), else None."""
+    if isinstance(column, array):
+        return column.typecode
+    if isinstance(column, memoryview):
+        return column.format
+    return None
+
+
+class StringColumn:
+    """Strings packed into one UTF-8 buffer, delimited by an offsets array.
+
+    Non-string values (such as updated_at timestamps) are stored as str().
+    data and offsets may also be memoryviews over a larger shared buffer
+    (see snapshot.py): offsets then index into that buffer directly.
+    """
+
+    def __init__(self, data, offsets):
+        self.data = data
+        self.offsets = offsets
+
+    @classmethod
+    def from_strings(cls, values):
+        encoded = [
+            (value if isinstance(value, str) else str(value)).encode('utf-8')
+            for value in values
+        ]
+        offsets = array('q', accumulate(map(len, encoded), initial=0))
+        return cls(b''.join(encoded), offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('StringColumn index out of range')
+        start, end = self.offsets[index], self.offsets[index + 1]
+        return str(self.data[start:end], 'utf-8')
+
+    def __iter__(self):
+        data = self.data
+        offsets = self.offsets
+        for i in range(len(self)):
+            yield str(data[offsets[i]:offsets[i + 1]], 'utf-8')
+
+    @property
+    def nbytes(self):
+        offsets = self.offsets
+        return offsets[-1] - offsets[0] + offsets.itemsize * len(offsets)
+
+
+class UUIDColumn:
+    """UUIDs stored as consecutive 16-byte values, read back as strings."""
+
+    def __init__(self, data):
+        self.data = data
+
+    def __len__(self):
+        return len(self.data) // 16
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('UUIDColumn index out of range')
+        return str(uuid.UUID(bytes=bytes(self.data[index * 16:index * 16 + 16])))
+
+    def __iter__(self):
+        data = self.data
+        for start in range(0, len(data), 16):
+            yield str(uuid.UUID(bytes=bytes(data[start:start + 16])))
+
+    @property
+    def nbytes(self):
+        return len(self.data)
+
+
+class ColumnBatch:
+    """A batch of rows stored as a mapping of column name to column."""
+
+    def __init__(self, columns):
+        self.columns = columns
+
+    @classmethod
+    def from_rows(cls, names, rows):
+        """Build a batch from tuple rows whose fields are named by `names`."""
+        values = list(zip(*rows)) if rows else [()] * len(names)
+        columns = {}
+        for name, column in zip(names, values):
+            if name in NUMERIC_COLUMNS:
+                columns[name] = array('d', map(float, column))
+            else:
+                columns[name] = StringColumn.from_strings(column)
+        return cls(columns)
+
+    def __len__(self):
+        for column in self.columns.values():
+            return len(column)
+        return 0
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    @property
+    def names(self):
+        return tuple(self.columns)
+
+    @property
+    def nbytes(self):
+        """Bytes of column data held by this batch."""
+        return sum(
+            column.itemsize * len(column) if isinstance(column, array)
+            else column.nbytes
+            for column in self.columns.values()
+        )
+
+    def mask(self, name, predicate):
+        """Return a list of booleans: predicate applied to column `name`."""
+        return list(map(predicate, self.columns[name]))
+
+    def where(self, mask):
+        """Return a new batch with only the rows whose mask entry is true."""
+        columns = {}
+        for name, column in self.columns.items():
+            kept = compress(column, mask)
+            if typecode(column):
+                columns[name] = array(typecode(column), kept)
+            else:
+                columns[name] = StringColumn.from_strings(kept)
+        return ColumnBatch(columns)
+
+    def rows(self):
+        """Yield the batch as dicts, for consumers that want rows back."""
+        names = self.names
+        for values in zip(*self.columns.values()):
+            yield dict(zip(names, values))
+
+    def to_numpy(self):
+        """Return the batch as a NumPy structured array (needs numpy)."""
+        import numpy as np
+
+        fields = []
+        for name, column in self.columns.items():
+            if typecode(column):
+                fields.append((name, 'f8'))
+            else:
+                width = max(map(len, column), default=1) or 1
+                fields.append((name, f'U{width}'))
+        result = np.empty(len(self), dtype=fields)
+        for name, column in self.columns.items():
+            result[name] = list(column)
+        return result
@@ -0,0 +1,52 @@
+"""Compact, tuple-backed rows for the user_data generators.
+
+The dictionary cursor builds a fresh dict for every row. In 'tuple' row
+mode rows are namedtuples instead: they keep attribute access (row.age,
+row.email) while the field names live once in a Row class shared by every
+row with the same columns.
+"""
+from collections import namedtuple
+from functools import lru_cache
+
+from keys import decode_iter, decode_rows
+
+ROW_MODES = ('dict', 'tuple')
+
+
+@lru_cache(maxsize=None)
+def row_class(column_names):
+    """Return the shared Row namedtuple class for a tuple of column names."""
+    return namedtuple('Row', column_names, rename=True)
+
+
+def make_cursor(connection, row_mode='dict', **kwargs):
+    """Open a cursor whose rows suit row_mode ('dict' or 'tuple')."""
+    if row_mode not in ROW_MODES:
+        raise ValueError(f"row_mode must be one of {ROW_MODES}, not {row_mode!r}")
+    return connection.cursor(dictionary=row_mode == 'dict', **kwargs)
+
+
+def wrap_rows(cursor, rows, row_mode='dict'):
+    """Convert a list returned by fetchall()/fetchmany() to row_mode rows.
+
+    Binary user_id keys are decoded to UUID strings.
+    """
+    rows = decode_rows(rows, cursor.column_names)
+    if row_mode == 'dict':
+        return rows
+    return list(map(row_class(tuple(cursor.column_names))._make, rows))
+
+
+def iter_rows(cursor, row_mode='dict'):
+    """Iterate over the remaining rows of cursor in row_mode."""
+    rows = decode_iter(cursor, cursor.column_names)
+    if row_mode == 'dict':
+        return rows
+    return map(row_class(tuple(cursor.column_names))._make, rows)
+
+
+def field(row, name):
+    """Read a field from either a dict row or a Row."""
+    if isinstance(row, dict):
+        return row[name]
+    return getattr(row, name)
@@ -0,0 +1,138 @@
+"""Parallel parsing of large user_data CSV files.
+
+The file is split into byte ranges that are aligned to line boundaries and
+parsed in a process pool, while parsed batches are handed to a single writer
+through a bounded queue, so parsing and database I/O overlap.
+
+Records must not contain embedded newlines (true of user_data.csv). This
+module does not import seed, so worker processes never touch the database.
+"""
+import csv
+import io
+import os
+import queue
+import threading
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from prefetch import put_unless_stopped
+
+CHUNK_BYTES = 4 * 1024 * 1024
+_DONE = object()
+
+
+def chunk_ranges(csv_file, chunk_bytes=CHUNK_BYTES):
+    """Return the header fields and the (start, end) byte ranges of the data."""
+    size = os.path.getsize(csv_file)
+    with open(csv_file, 'rb') as f:
+        header = f.readline()
+        data_start = f.tell()
+    fieldnames = next(csv.reader([header.decode('utf-8')]))
+    ranges = [
+        (start, min(start + chunk_bytes, size))
+        for start in range(data_start, size, chunk_bytes)
+    ]
+    return fieldnames, ranges
+
+
+def read_range(csv_file, start, end):
+    """Return the text of every line that starts inside [start, end)."""
+    with open(csv_file, 'rb') as f:
+        # The header always precedes the data, so start - 1 is valid.
+        f.seek(start - 1)
+        at_line_start = f.read(1) == b'\n'
+        data = f.read(end - start)
+        if not at_line_start:
+            # The first partial line belongs to the previous range.
+            newline = data.find(b'\n')
+            if newline < 0:
+                return ''
+            data = data[newline + 1:]
+        if data and not data.endswith(b'\n'):
+            # Finish the last line, which started inside this range.
+            data += f.readline()
+    return data.decode('utf-8')
+
+
+def parse_row(row):
+    """Validate one CSV record; return a user_data tuple or None if invalid."""
+    try:
+        name = row['name'].strip()
+        email = row['email'].strip().lower()
+        age = int(float(row['age']))
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return None
+    if not name or '@' not in email or age < 0:
+        return None
+    return (str(uuid.uuid4()), name, email, age)
+
+
+def parse_chunk(csv_file, fieldnames, start, end):
+    """Parse one byte range; return (rows, rejected)."""
+    reader = csv.DictReader(
+        io.StringIO(read_range(csv_file, start, end)), fieldnames=fieldnames)
+    rows = []
+    rejected = 0
+    for record in reader:
+        row = parse_row(record)
+        if row is None:
+            rejected += 1
+        else:
+            rows.append(row)
+    return rows, rejected
+
+
+def parse_csv_parallel(csv_file, workers=None, chunk_bytes=CHUNK_BYTES,
+                       queue_size=8):
+    """Generator of (rows, rejected) batches parsed by a pool of processes.
+
+    Batches come out in file order. At most queue_size parsed batches wait
+    for the consumer, so a slow writer throttles the parsers instead of
+    letting them fill memory.
+    """
+    fieldnames, ranges = chunk_ranges(csv_file, chunk_bytes)
+    workers = workers or os.cpu_count() or 1
+    batches = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+
+    def produce():
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                pending = deque()
+                todo = iter(ranges)
+
+                def submit(byte_range):
+                    pending.append(pool.submit(
+                        parse_chunk, csv_file, fieldnames, *byte_range))
+
+                # Keep every worker busy with one range queued behind it.
+                for byte_range in islice(todo, workers * 2):
+                    submit(byte_range)
+                while pending:
+                    if not put_unless_stopped(
+                            batches, pending.popleft().result(), stop):
+                        for future in pending:
+                            future.cancel()
+                        return
+                    byte_range = next(todo, None)
+                    if byte_range is not None:
+                        submit(byte_range)
+            put_unless_stopped(batches, _DONE, stop)
+        except BaseException as err:
+            put_unless_stopped(batches, err, stop)
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = batches.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        producer.join()
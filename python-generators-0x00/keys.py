@@ -0,0 +1,68 @@
+"""user_id encoding for the CHAR(36) and BINARY(16) key formats.
+
+Callers always see user_id as the usual 36-character UUID string. When the
+table stores keys as BINARY(16), query parameters are encoded on the way
+in and fetched values decoded on the way out.
+"""
+import uuid
+
+KEY = 'user_id'
+_BINARY = (bytes, bytearray)
+
+
+def encode_key(user_id):
+    """Return the BINARY(16) form of a UUID string (or a leading hex prefix)."""
+    if isinstance(user_id, _BINARY):
+        return bytes(user_id)
+    return bytes.fromhex(str(user_id).replace('-', ''))
+
+
+def decode_key(value):
+    """Return the UUID string for a BINARY(16) key; other values unchanged."""
+    if isinstance(value, _BINARY):
+        return str(uuid.UUID(bytes=bytes(value)))
+    return value
+
+
+def decode_rows(rows, column_names):
+    """Decode binary user_id values in a list of dict or tuple rows.
+
+    Dict rows are updated in place; tuple rows are rebuilt. Rows whose keys
+    are already strings are returned untouched at the cost of one check.
+    """
+    if not rows:
+        return rows
+    first = rows[0]
+    if isinstance(first, dict):
+        if not isinstance(first.get(KEY), _BINARY):
+            return rows
+        for row in rows:
+            row[KEY] = decode_key(row[KEY])
+        return rows
+    if KEY not in column_names:
+        return rows
+    index = list(column_names).index(KEY)
+    if not isinstance(first[index], _BINARY):
+        return rows
+    return [
+        row[:index] + (decode_key(row[index]),) + row[index + 1:]
+        for row in rows
+    ]
+
+
+def decode_iter(rows, column_names):
+    """Lazily decode binary user_id values in an iterator of rows."""
+    rows = iter(rows)
+    for row in rows:
+        if isinstance(row, dict):
+            binary = isinstance(row.get(KEY), _BINARY)
+        else:
+            binary = (KEY in column_names and isinstance(
+                row[list(column_names).index(KEY)], _BINARY))
+        if not binary:
+            yield row
+            yield from rows
+            return
+        yield decode_rows([row], column_names)[0]
+        for row in rows:
+            yield decode_rows([row], column_names)[0]
@@ -0,0 +1,162 @@
+"""Migrate user_data to BINARY(16) user_id keys and an age index.
+
+The UUIDs are converted in key-ordered chunks (each its own transaction)
+into a new column, which then replaces the CHAR(36) key in one ALTER. The
+redundant user_id_index is dropped and age_index added. Table and index
+sizes and the time of two range scans are reported before and after.
+updated_at, on tables that have it, is preserved, so incremental readers
+do not see every row as changed. Running it again after an interruption
+picks up where it stopped.
+
+Usage: python migrate_keys.py [chunk_size]
+"""
+import sys
+import time
+
+import seed
+from query import Key, bind
+
+CHUNK_SIZE = 10000
+
+
+def columns(cursor):
+    cursor.execute("""
+        SELECT COLUMN_NAME FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'user_data'
+    """)
+    return {row[0] for row in cursor.fetchall()}
+
+
+def index_names(cursor):
+    cursor.execute("""
+        SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'user_data'
+    """)
+    return {row[0] for row in cursor.fetchall()}
+
+
+def table_size(cursor):
+    """Return (data MB, index MB) for user_data after refreshing statistics."""
+    cursor.execute("ANALYZE TABLE user_data")
+    cursor.fetchall()
+    cursor.execute("""
+        SELECT DATA_LENGTH, INDEX_LENGTH FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'user_data'
+    """)
+    data_length, index_length = cursor.fetchone()
+    return data_length / 2 ** 20, index_length / 2 ** 20
+
+
+def time_scans(cursor, binary_keys):
+    """Return milliseconds for a 1/16 key range scan and an age range scan."""
+    timings = {}
+    low, high = bind((Key('40000000'), Key('50000000')), binary_keys)
+    for name, sql, params in (
+        ('key_range_ms',
+         "SELECT COUNT(*) FROM user_data WHERE user_id >= %s AND user_id < %s",
+         (low, high)),
+        ('age_range_ms',
+         "SELECT COUNT(*) FROM user_data WHERE age BETWEEN %s AND %s",
+         (30, 39)),
+    ):
+        start = time.perf_counter()
+        cursor.execute(sql, params)
+        cursor.fetchall()
+        timings[name] = (time.perf_counter() - start) * 1000
+    return timings
+
+
+def report(cursor, binary_keys):
+    data_mb, index_mb = table_size(cursor)
+    return dict(data_mb=data_mb, index_mb=index_mb,
+                **time_scans(cursor, binary_keys))
+
+
+def convert_keys(connection, cursor, chunk_size=CHUNK_SIZE,
+                 keep_updated_at=False):
+    """Fill user_id_bin from user_id, chunk_size rows per transaction.
+
+    With keep_updated_at=True (the table has an updated_at column) the
+    column is assigned its own value so ON UPDATE does not bump it.
+    """
+    assignments = "user_id_bin = UNHEX(REPLACE(user_id, '-', ''))"
+    if keep_updated_at:
+        assignments += ", updated_at = updated_at"
+    cursor.execute("SELECT user_id FROM user_data WHERE user_id_bin IS NOT NULL "
+                   "ORDER BY user_id DESC LIMIT 1")
+    row = cursor.fetchone()
+    last = row[0] if row else ''
+    converted = 0
+    while True:
+        cursor.execute(
+            "SELECT user_id FROM user_data WHERE user_id > %s "
+            "ORDER BY user_id LIMIT 1 OFFSET %s",
+            (last, chunk_size - 1)
+        )
+        row = cursor.fetchone()
+        if row:
+            condition, params = "user_id > %s AND user_id <= %s", (last, row[0])
+        else:
+            condition, params = "user_id > %s", (last,)
+        cursor.execute(
+            f"UPDATE user_data SET {assignments} WHERE {condition}",
+            params
+        )
+        converted += cursor.rowcount
+        connection.commit()
+        if not row:
+            return converted
+        last = row[0]
+
+
+def migrate(connection, chunk_size=CHUNK_SIZE):
+    """Convert user_data to BINARY(16) keys; return the rows converted."""
+    cursor = connection.cursor()
+    existing = columns(cursor)
+    if 'user_id_bin' not in existing:
+        cursor.execute("ALTER TABLE user_data ADD COLUMN user_id_bin BINARY(16) NULL")
+    converted = convert_keys(connection, cursor, chunk_size,
+                             'updated_at' in existing)
+
+    indexes = index_names(cursor)
+    changes = ["DROP PRIMARY KEY"]
+    for name in ('user_id_index', 'updated_at_index'):
+        if name in indexes:
+            changes.append(f"DROP INDEX {name}")
+    changes += [
+        "DROP COLUMN user_id",
+        "CHANGE user_id_bin user_id BINARY(16) NOT NULL FIRST",
+        "ADD PRIMARY KEY (user_id)",
+    ]
+    if 'updated_at' in existing:
+        changes.append("ADD INDEX updated_at_index (updated_at, user_id)")
+    if 'age_index' not in indexes:
+        changes.append("ADD INDEX age_index (age)")
+    cursor.execute("ALTER TABLE user_data " + ", ".join(changes))
+    cursor.close()
+    seed.reset_key_format()
+    return converted
+
+
+def main(chunk_size=CHUNK_SIZE):
+    connection = seed.connect_to_prodev()
+    cursor = connection.cursor()
+    if seed.binary_keys():
+        if 'age_index' not in index_names(cursor):
+            cursor.execute("ALTER TABLE user_data ADD INDEX age_index (age)")
+        print("user_data already uses BINARY(16) keys")
+        return
+    before = report(cursor, False)
+    start = time.perf_counter()
+    converted = migrate(connection, chunk_size)
+    print(f"Converted {converted} keys in {time.perf_counter() - start:.1f}s")
+    after = report(cursor, True)
+    cursor.close()
+    connection.close()
+    print(f"{'':>14} {'before':>10} {'after':>10}")
+    for name in ('data_mb', 'index_mb', 'key_range_ms', 'age_range_ms'):
+        print(f"{name:>14} {before[name]:>10.2f} {after[name]:>10.2f}")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,148 @@
+"""Parallel scans of user_data split into disjoint user_id ranges.
+
+user_id values are random (version 4) UUIDs, so cutting the hex key space
+into equal slices gives partitions of about the same size. Each partition
+is scanned by a worker process over its own pooled connection, so a full
+table scan uses several cores and connections at once.
+"""
+import multiprocessing
+import os
+import queue
+from concurrent.futures import ProcessPoolExecutor
+
+import seed
+from keys import decode_rows
+from prefetch import put_unless_stopped
+from query import col, select_sql
+
+KEY_SPACE = 16 ** 8  # first 8 hex digits of a UUID
+_DONE = object()
+
+# Set in each worker process by _init_worker().
+_results = None
+_stop = None
+
+
+def key_ranges(partitions):
+    """Return [(low, high), ...] user_id bounds covering the whole key space.
+
+    low is inclusive and high exclusive; None means unbounded.
+    """
+    bounds = [
+        format(i * KEY_SPACE // partitions, '08x') for i in range(partitions + 1)
+    ]
+    bounds[0] = None
+    bounds[-1] = None
+    return list(zip(bounds, bounds[1:]))
+
+
+def partition_predicate(low, high, where=None):
+    """Combine a partition's key bounds with an optional extra predicate."""
+    predicate = where
+    for bound in ((col('user_id') >= low) if low is not None else None,
+                  (col('user_id') < high) if high is not None else None):
+        if bound is not None:
+            predicate = bound if predicate is None else predicate & bound
+    return predicate
+
+
+def scan_partition(low, high, columns=None, where=None, batch_size=10000):
+    """Generator yielding the rows of one partition in batches."""
+    sql, params = select_sql(columns, partition_predicate(low, high, where),
+                             binary_keys=seed.binary_keys())
+    with seed.pooled_connection() as conn:
+        cursor = conn.cursor(dictionary=True, buffered=False)
+        cursor.execute(sql, params)
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                break
+            yield decode_rows(batch, cursor.column_names)
+        cursor.close()
+
+
+def _init_worker(results, stop):
+    global _results, _stop
+    # Batches still buffered when the consumer stops reading could never be
+    # flushed, and waiting for them at exit would keep the worker alive.
+    results.cancel_join_thread()
+    _results = results
+    _stop = stop
+
+
+def _stream_partition(index, low, high, columns, where, batch_size):
+    """Worker task: send a partition's batches to the parent, then a marker."""
+    batches = scan_partition(low, high, columns, where, batch_size)
+    try:
+        for batch in batches:
+            if not put_unless_stopped(_results, (index, batch), _stop):
+                return
+    finally:
+        batches.close()
+        put_unless_stopped(_results, (index, None), _stop)
+
+
+def _reduce_partition(func, low, high, columns, where, batch_size):
+    """Worker task: apply func to a partition's batches and return the result."""
+    return func(scan_partition(low, high, columns, where, batch_size))
+
+
+def partitioned_scan(partitions=8, workers=None, columns=None, where=None,
+                     batch_size=10000, merged=True, queue_size=16):
+    """Scan user_data with one worker process per partition.
+
+    Yields rows as they arrive from all partitions when merged is True, or
+    (partition, batch) pairs when merged is False. At most queue_size
+    batches wait for the consumer; closing the generator stops the workers.
+    """
+    workers = workers or min(partitions, os.cpu_count() or 1)
+    context = multiprocessing.get_context()
+    results = context.Queue(maxsize=queue_size)
+    stop = context.Event()
+    executor = ProcessPoolExecutor(
+        max_workers=workers, mp_context=context,
+        initializer=_init_worker, initargs=(results, stop))
+    try:
+        futures = [
+            executor.submit(_stream_partition, index, low, high, columns,
+                            where, batch_size)
+            for index, (low, high) in enumerate(key_ranges(partitions))
+        ]
+        remaining = partitions
+        while remaining:
+            try:
+                index, batch = results.get(timeout=1)
+            except queue.Empty:
+                for future in futures:
+                    if future.done() and future.exception():
+                        raise future.exception()
+                continue
+            if batch is None:
+                remaining -= 1
+            elif merged:
+                yield from batch
+            else:
+                yield index, batch
+        for future in futures:
+            future.result()
+    finally:
+        stop.set()
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def map_partitions(func, partitions=8, workers=None, columns=None, where=None,
+                   batch_size=10000):
+    """Run func(batches) on every partition in parallel; return the results.
+
+    func must be a module-level function (so it can be sent to the worker
+    processes) taking an iterator of row batches. Results are returned in
+    partition order, ready to be merged by the caller.
+    """
+    workers = workers or min(partitions, os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(_reduce_partition, func, low, high, columns,
+                            where, batch_size)
+            for low, high in key_ranges(partitions)
+        ]
+        return [future.result() for future in futures]
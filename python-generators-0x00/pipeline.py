@@ -0,0 +1,154 @@
+"""Composable generator pipelines over user_data streams.
+
+A Pipeline chains stages (map, filter, flatten, batch, window) onto a source
+iterable such as stream_users_in_batches() and ends in a sink:
+
+    users = Pipeline(stream_users_in_batches(1000, keyset=True)).flatten()
+    adults = users.filter(lambda user: user['age'] > 25)
+    adults.map(score, workers=4, processes=True, chunk_size=500).sink(save)
+
+Stages are generators, so nothing runs until the pipeline is iterated or
+sunk, and every stage pulls from the one before it. A stage built with
+thread=True runs in its own thread, and map/filter with workers=N run on a
+thread or process pool; both hand items on through bounded queues, so a
+slow consumer throttles the stages ahead of it instead of letting them
+fill memory. Functions given to a process pool must be picklable (defined
+at module level).
+"""
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
+
+from prefetch import prefetched
+
+QUEUE_SIZE = 4
+
+
+def _map_chunk(func, chunk):
+    return [func(item) for item in chunk]
+
+
+def _filter_chunk(predicate, chunk):
+    return [item for item in chunk if predicate(item)]
+
+
+def chunks(items, size):
+    """Generator of lists of up to size consecutive items."""
+    items = iter(items)
+    while True:
+        chunk = list(islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def pooled(chunk_func, func, items, workers, processes=False, chunk_size=1,
+           queue_size=None):
+    """Generator running chunk_func(func, chunk) on a pool, in input order.
+
+    At most queue_size chunks (twice the workers by default) are submitted
+    but not yet consumed, which bounds memory and applies backpressure.
+    """
+    executor = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    in_flight = queue_size or workers * 2
+    todo = chunks(items, chunk_size)
+    pending = deque()
+    with executor(max_workers=workers) as pool:
+        try:
+            for chunk in islice(todo, in_flight):
+                pending.append(pool.submit(chunk_func, func, chunk))
+            while pending:
+                results = pending.popleft().result()
+                chunk = next(todo, None)
+                if chunk is not None:
+                    pending.append(pool.submit(chunk_func, func, chunk))
+                yield from results
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def flatten(batches):
+    """Generator of the items of every batch in turn."""
+    for batch in batches:
+        yield from batch
+
+
+def windowed(items, size, step=1):
+    """Generator of tuples of the last size items, every step items.
+
+    step=1 gives a sliding window, step=size tumbling windows. Only full
+    windows are produced.
+    """
+    window = deque(maxlen=size)
+    since = 0
+    for item in items:
+        window.append(item)
+        since += 1
+        if len(window) == size and since >= step:
+            since = 0
+            yield tuple(window)
+
+
+class Pipeline:
+    """A source iterable followed by a chain of generator stages."""
+
+    def __init__(self, source, queue_size=QUEUE_SIZE):
+        self.stream = source
+        self.queue_size = queue_size
+
+    def pipe(self, stage, *args, thread=False, **kwargs):
+        """Add stage(items, *args, **kwargs), a function returning an iterator.
+
+        With thread=True the stage runs in a thread of its own and its output
+        is buffered in a queue of queue_size items.
+        """
+        stream = stage(self.stream, *args, **kwargs)
+        if thread:
+            stream = prefetched(stream, self.queue_size)
+        return Pipeline(stream, self.queue_size)
+
+    def map(self, func, workers=0, processes=False, chunk_size=1, thread=False):
+        """Apply func to every item, on workers threads or processes if set.
+
+        Items are sent to the pool chunk_size at a time; use larger chunks for
+        processes so pickling does not dominate. Output order is kept.
+        """
+        if workers:
+            return self.pipe(lambda items: pooled(
+                _map_chunk, func, items, workers, processes, chunk_size),
+                thread=thread)
+        return self.pipe(lambda items: map(func, items), thread=thread)
+
+    def filter(self, predicate, workers=0, processes=False, chunk_size=1,
+               thread=False):
+        """Keep the items for which predicate is true (see map for workers)."""
+        if workers:
+            return self.pipe(lambda items: pooled(
+                _filter_chunk, predicate, items, workers, processes,
+                chunk_size), thread=thread)
+        return self.pipe(lambda items: filter(predicate, items), thread=thread)
+
+    def flatten(self, thread=False):
+        """Turn a stream of batches into a stream of their items."""
+        return self.pipe(flatten, thread=thread)
+
+    def batch(self, size, thread=False):
+        """Group items into lists of size items (the last may be shorter)."""
+        return self.pipe(chunks, size, thread=thread)
+
+    def window(self, size, step=1, thread=False):
+        """Group items into windows of the last size items (see windowed)."""
+        return self.pipe(windowed, size, step, thread=thread)
+
+    def __iter__(self):
+        return iter(self.stream)
+
+    def sink(self, func=None):
+        """Run the pipeline, passing each item to func; return the item count."""
+        count = 0
+        for item in self.stream:
+            if func is not None:
+                func(item)
+            count += 1
+        return count
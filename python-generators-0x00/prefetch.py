@@ -0,0 +1,71 @@
+"""Run a generator ahead of its consumer in a background thread."""
+import queue
+import threading
+
+_DONE = object()
+
+
+class _Failure:
+    """Carries an exception raised by the source over to the consumer."""
+
+    def __init__(self, error):
+        self.error = error
+
+
+def put_unless_stopped(buffer, item, stop, poll=0.1):
+    """Put item on the bounded queue buffer, waiting while it is full.
+
+    Gives up once the event stop is set, so a producer never blocks forever
+    on a consumer that went away. Works with queue.Queue and
+    multiprocessing queues alike. Returns True if the item was queued.
+    """
+    while not stop.is_set():
+        try:
+            buffer.put(item, timeout=poll)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def prefetched(source, depth=2):
+    """Generator yielding the items of `source`, fetched up to `depth` ahead.
+
+    A worker thread drives `source` and parks its items in a bounded buffer,
+    so fetching the next batch overlaps with the consumer's work on the
+    current one. Exceptions from `source` are re-raised in the consumer.
+    Closing this generator early stops the worker, which then closes
+    `source` (if it is a generator) in its own thread so its connections
+    are released.
+    """
+    buffer = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def work():
+        try:
+            for item in source:
+                if not put_unless_stopped(buffer, item, stop):
+                    break
+            else:
+                put_unless_stopped(buffer, _DONE, stop)
+        except BaseException as err:
+            put_unless_stopped(buffer, _Failure(err), stop)
+        finally:
+            # Plain iterators (map, filter, ...) have nothing to close.
+            close = getattr(source, 'close', None)
+            if close is not None:
+                close()
+
+    worker = threading.Thread(target=work, daemon=True)
+    worker.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+        worker.join()
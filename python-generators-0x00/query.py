@@ -0,0 +1,154 @@
+"""Small SQL builder for reading user_data.
+
+Predicates are built from columns and compiled to a parameterised WHERE
+clause, so filtering happens in the database and only the matching rows
+cross the wire:
+
+    (col('age') > 25) & col('email').like('%@gmail.com')
+
+Column names are checked against COLUMNS; values are always sent as
+parameters. user_id values are encoded to match the key column's storage
+format (CHAR(36) or BINARY(16)) when the query is built.
+"""
+from keys import encode_key
+
+TABLE = 'user_data'
+COLUMNS = ('user_id', 'name', 'email', 'age', 'updated_at')
+KEY = 'user_id'
+
+
+def check_column(name):
+    """Return name if it is a user_data column, else raise ValueError."""
+    if name not in COLUMNS:
+        raise ValueError(f"Unknown user_data column: {name!r}")
+    return name
+
+
+class Key:
+    """A user_id parameter, encoded for the key column by select_sql()."""
+
+    def __init__(self, value):
+        self.value = value
+
+    def __repr__(self):
+        return f"Key({self.value!r})"
+
+
+def bind(params, binary_keys=False):
+    """Resolve Key parameters to the key column's storage format."""
+    return tuple(
+        (encode_key(param.value) if binary_keys else str(param.value))
+        if isinstance(param, Key) else param
+        for param in params
+    )
+
+
+class Predicate:
+    """A compiled WHERE condition: SQL text plus its parameters."""
+
+    def __init__(self, sql, params=()):
+        self.sql = sql
+        self.params = tuple(params)
+
+    def __and__(self, other):
+        return Predicate(f"({self.sql} AND {other.sql})",
+                         self.params + other.params)
+
+    def __or__(self, other):
+        return Predicate(f"({self.sql} OR {other.sql})",
+                         self.params + other.params)
+
+    def __invert__(self):
+        return Predicate(f"(NOT {self.sql})", self.params)
+
+    def __repr__(self):
+        return f"Predicate({self.sql!r}, {self.params!r})"
+
+
+class col:
+    """A user_data column used to build predicates."""
+
+    def __init__(self, name):
+        self.name = check_column(name)
+
+    def _param(self, value):
+        return Key(value) if self.name == KEY else value
+
+    def _compare(self, op, value):
+        return Predicate(f"{self.name} {op} %s", (self._param(value),))
+
+    def __eq__(self, value):
+        return self._compare('=', value)
+
+    def __ne__(self, value):
+        return self._compare('<>', value)
+
+    def __lt__(self, value):
+        return self._compare('<', value)
+
+    def __le__(self, value):
+        return self._compare('<=', value)
+
+    def __gt__(self, value):
+        return self._compare('>', value)
+
+    def __ge__(self, value):
+        return self._compare('>=', value)
+
+    __hash__ = None
+
+    def between(self, low, high):
+        return Predicate(f"{self.name} BETWEEN %s AND %s",
+                         (self._param(low), self._param(high)))
+
+    def isin(self, values):
+        values = tuple(map(self._param, values))
+        if not values:
+            return Predicate("1 = 0")
+        placeholders = ', '.join(['%s'] * len(values))
+        return Predicate(f"{self.name} IN ({placeholders})", values)
+
+    def like(self, pattern):
+        return self._compare('LIKE', pattern)
+
+
+def select_columns(columns=None, required=()):
+    """Return the SELECT list for columns, adding any required columns."""
+    if columns is None:
+        return '*'
+    columns = [check_column(name) for name in columns]
+    for name in required:
+        if name not in columns:
+            columns.append(name)
+    return ', '.join(columns)
+
+
+def select_sql(columns=None, where=None, after=None, keyset=False,
+               limit=None, offset=None, order_by=(KEY,), binary_keys=False):
+    """Build a SELECT over user_data; return (sql, params).
+
+    after is the last key seen when paging with keyset=True. Rows are ordered
+    by order_by (the key by default) whenever a limit is given so that pages
+    are deterministic; in keyset mode the order_by columns are always selected.
+    Pass binary_keys=True when user_id is stored as BINARY(16).
+    """
+    order_by = [check_column(name) for name in order_by]
+    conditions = []
+    params = []
+    if where is not None:
+        conditions.append(where.sql)
+        params.extend(where.params)
+    if after is not None:
+        conditions.append(f"{KEY} > %s")
+        params.append(Key(after))
+    required = order_by if keyset else ()
+    sql = f"SELECT {select_columns(columns, required)} FROM {TABLE}"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    if limit is not None:
+        sql += f" ORDER BY {', '.join(order_by)} LIMIT %s"
+        params.append(limit)
+        if offset is not None:
+            sql += " OFFSET %s"
+            params.append(offset)
+    return sql, bind(params, binary_keys)
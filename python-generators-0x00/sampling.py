@@ -0,0 +1,118 @@
+"""Random samples of user_data without a full scan.
+
+sample_users() pushes the sampling down to MySQL: it draws random UUIDs and
+fetches, for each, the first row whose user_id is at or after it. That is
+one primary key lookup per sampled row, so the cost grows with the sample
+size and only logarithmically with the table. The sample is NOT uniform:
+a row is picked with probability proportional to the key gap before it.
+user_ids are random (UUID version 4), so the gaps are roughly exponentially
+distributed: a row at the 90th percentile of gap size is picked about 20
+times as often as one at the 10th, and rows after very small gaps are
+almost never picked. With a where filter, the gap includes the keys of
+the filtered-out rows before a row. Use it where a rough sample is enough
+(spot checks, estimates of common values); use reservoir_sample() over a
+scan when every row must be equally likely.
+
+reservoir_sample() takes a uniform sample of any stream in one pass (for
+example the rows of stream_users_in_batches() or a Pipeline). It has to read
+the stream, but only draws O(k log(n / k)) random numbers and keeps k items.
+"""
+import math
+import random
+import uuid
+from itertools import islice
+
+import seed
+from keys import decode_rows
+from query import col, select_sql
+
+# Key lookups combined into one statement.
+PROBES_PER_QUERY = 200
+# Give up after this many rounds that find no new rows (e.g. k > table size).
+MAX_IDLE_ROUNDS = 3
+
+
+def random_keys(count, rng):
+    """Return count random user_id values in UUID string form."""
+    return [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(count)]
+
+
+def probe_sql(keys, columns=None, where=None, binary_keys=False):
+    """Build one statement returning the first row at or after each key."""
+    parts = []
+    params = []
+    for i, key in enumerate(keys):
+        condition = col('user_id') >= key
+        if where is not None:
+            condition = where & condition
+        sql, part_params = select_sql(columns, condition, keyset=True, limit=1,
+                                      binary_keys=binary_keys)
+        parts.append(f"SELECT * FROM ({sql}) AS probe{i}")
+        params.extend(part_params)
+    return " UNION ALL ".join(parts), params
+
+
+def sample_users(k, columns=None, where=None, random_seed=None):
+    """Return a list of about k distinct random rows (dicts) from user_data.
+
+    columns and where work as in stream_users_in_batches(); user_id is
+    always selected. Rows are not equally likely: each is picked with
+    probability proportional to the user_id gap before it (see the module
+    docstring), so use reservoir_sample() when the sample must be uniform.
+    As k nears the number of matching rows, fewer than k may come back,
+    since rows just after a small key gap are rarely hit; scan the table
+    instead for samples that large.
+    """
+    rng = random.Random(random_seed)
+    sample = {}
+    idle_rounds = 0
+    with seed.pooled_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        binary_keys = seed.binary_keys(conn)
+        while len(sample) < k and idle_rounds < MAX_IDLE_ROUNDS:
+            found = len(sample)
+            # Some probes land past the last key or on an already sampled row.
+            wanted = k - len(sample)
+            keys = random_keys(wanted + wanted // 10 + 1, rng)
+            for start in range(0, len(keys), PROBES_PER_QUERY):
+                sql, params = probe_sql(keys[start:start + PROBES_PER_QUERY],
+                                        columns, where, binary_keys)
+                cursor.execute(sql, params)
+                for row in decode_rows(cursor.fetchall(), cursor.column_names):
+                    sample.setdefault(row['user_id'], row)
+            idle_rounds = idle_rounds + 1 if len(sample) == found else 0
+        cursor.close()
+    rows = list(sample.values())
+    rng.shuffle(rows)
+    return rows[:k]
+
+
+def _uniform(rng):
+    """Return a float in (0, 1], safe to take the log of."""
+    return 1.0 - rng.random()
+
+
+def reservoir_sample(items, k, random_seed=None):
+    """Return k items chosen uniformly from the iterable items in one pass.
+
+    Uses Li's Algorithm L, which skips ahead between replacements instead of
+    drawing a random number per item. Returns every item if there are
+    fewer than k.
+    """
+    rng = random.Random(random_seed)
+    items = iter(items)
+    reservoir = list(islice(items, k))
+    if len(reservoir) < k or k == 0:
+        return reservoir
+    weight = math.exp(math.log(_uniform(rng)) / k)
+    missing = object()
+    while True:
+        if weight >= 1.0:
+            skip = 0
+        else:
+            skip = math.floor(math.log(_uniform(rng)) / math.log(1.0 - weight))
+        item = next(islice(items, skip, None), missing)
+        if item is missing:
+            return reservoir
+        reservoir[rng.randrange(k)] = item
+        weight *= math.exp(math.log(_uniform(rng)) / k)
@@ -1,16 +1,35 @@
 import mysql.connector
 from mysql.connector import errorcode
+from compact_rows import iter_rows, make_cursor
+from keys import encode_key
+from contextlib import contextmanager
+import argparse
+import checkpoint
 import csv
+import csv_pipeline
+import hashlib
+import io
+import os
+import queue
+import threading
+import time
 import uuid
 
+# Connection settings, overridable so the module can point at any local
+# MySQL/MariaDB instance.
+DB_CONFIG = {
+    'host': os.environ.get('MYSQL_HOST', 'localhost'),
+    'port': int(os.environ.get('MYSQL_PORT', 3306)),
+    'user': os.environ.get('MYSQL_USER', 'root'),
+    'password': os.environ.get('MYSQL_PASSWORD', ''),
+}
+DB_NAME = 'ALX_prodev'
+POOL_SIZE = int(os.environ.get('MYSQL_POOL_SIZE', 5))
+
 def connect_db():
     """Connect to MySQL server (no default DB)."""
     try:
-        conn = mysql.connector.connect(
-            host='localhost',
-            user='root',
-            password=''  
-        )
+        conn = mysql.connector.connect(**DB_CONFIG)
         return conn
     except mysql.connector.Error as err:
         print(f"Error: {err}")
@@ -28,29 +47,149 @@ def create_database(connection):
 def connect_to_prodev():
     """Connect to ALX_prodev database."""
     try:
-        conn = mysql.connector.connect(
-            host='localhost',
-            user='root',
-            password='', 
-            database='ALX_prodev'
-        )
+        conn = mysql.connector.connect(database=DB_NAME, **DB_CONFIG)
         return conn
     except mysql.connector.Error as err:
         print(f"Error connecting to ALX_prodev: {err}")
         return None
 
-def create_table(connection):
-    """Create user_data table with user_id(UUID), name, email, age."""
+class ConnectionPool:
+    """Bounded pool of connections to the ALX_prodev database.
+
+    At most `size` connections exist at once; get_connection() blocks for up
+    to `timeout` seconds when all of them are checked out. Idle connections
+    are pinged (and reconnected if needed) on checkout and have their
+    transaction rolled back on return. A connection returned with part of
+    an unbuffered result still unread (a stream closed early) is dropped
+    rather than drained, since draining would pull the rest of the result
+    over the wire.
+    """
+
+    def __init__(self, size=POOL_SIZE, timeout=30, **config):
+        self.size = size
+        self.timeout = timeout
+        self.config = dict(DB_CONFIG, database=DB_NAME)
+        self.config.update(config)
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def get_connection(self):
+        """Check out a healthy connection, opening a new one if none is idle."""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise mysql.connector.errors.PoolError(
+                f"No connection available after {self.timeout}s "
+                f"(pool size {self.size})")
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return mysql.connector.connect(**self.config)
+            conn.ping(reconnect=True, attempts=1)
+            return conn
+        except BaseException:
+            self._slots.release()
+            raise
+
+    @staticmethod
+    def _discard(conn):
+        """Close a connection that is not going back to the pool."""
+        try:
+            if conn.unread_result:
+                # Close the socket without QUIT, which would first read the
+                # rest of the result. The C extension cannot do this and
+                # closes normally.
+                try:
+                    conn.shutdown()
+                    return
+                except NotImplementedError:
+                    pass
+            conn.close()
+        except mysql.connector.Error:
+            pass
+
+    def release(self, conn):
+        """Reset a connection and hand it back to the pool.
+
+        Broken connections and ones with an unread result are dropped
+        instead; the slot is refilled on demand.
+        """
+        try:
+            if conn.unread_result:
+                self._discard(conn)
+                return
+            conn.rollback()
+        except mysql.connector.Error:
+            self._discard(conn)
+        else:
+            self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """Context manager that checks a connection out and returns it."""
+        conn = self.get_connection()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        """Close every idle connection."""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                conn.close()
+            except mysql.connector.Error:
+                pass
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """Return the process-wide connection pool, creating it on first use.
+
+    A forked child gets a pool of its own rather than sharing the parent's
+    sockets.
+    """
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool_pid != os.getpid():
+                _pool = ConnectionPool()
+                _pool_pid = os.getpid()
+    return _pool
+
+def pooled_connection():
+    """Borrow a connection from the shared pool: `with pooled_connection() as conn:`."""
+    return get_pool().connection()
+
+def create_table(connection, binary_keys=False):
+    """Create user_data table with user_id(UUID), name, email, age.
+
+    updated_at is maintained by MySQL on every insert and update, so
+    incremental readers can ask for the rows changed since a checkpoint.
+    With binary_keys=True user_id is stored as BINARY(16) instead of
+    CHAR(36); the generators encode and decode it transparently.
+    """
+    key_type = 'BINARY(16)' if binary_keys else 'CHAR(36)'
     cursor = connection.cursor()
     try:
-        cursor.execute("""
+        cursor.execute(f"""
             CREATE TABLE IF NOT EXISTS user_data (
-                user_id CHAR(36) PRIMARY KEY,
+                user_id {key_type} PRIMARY KEY,
                 name VARCHAR(255) NOT NULL,
                 email VARCHAR(255) NOT NULL,
                 age DECIMAL NOT NULL,
+                updated_at TIMESTAMP(6) NOT NULL
+                    DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
                 UNIQUE KEY email_unique (email),
-                INDEX user_id_index (user_id)
+                INDEX age_index (age),
+                INDEX updated_at_index (updated_at, user_id)
             )
         """)
         connection.commit()
@@ -59,34 +198,270 @@ def create_table(connection):
         print(f"Failed creating table: {err}")
     cursor.close()
 
-def insert_data(connection, csv_file):
-    """Insert CSV data into user_data table if email doesn't exist."""
+_binary_keys = None
+
+def binary_keys(conn=None):
+    """Return True if user_data.user_id is stored as BINARY(16).
+
+    The answer is looked up once per process; call reset_key_format() after
+    changing the table. Callers already holding a connection pass it as conn
+    so the lookup does not need a second one from the pool.
+    """
+    global _binary_keys
+    if _binary_keys is None:
+        if conn is None:
+            with pooled_connection() as conn:
+                return binary_keys(conn)
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT DATA_TYPE FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'user_data'
+              AND COLUMN_NAME = 'user_id'
+        """)
+        row = cursor.fetchone()
+        cursor.close()
+        data_type = row[0] if row else ''
+        if isinstance(data_type, (bytes, bytearray)):
+            data_type = data_type.decode()
+        _binary_keys = data_type.lower() in ('binary', 'varbinary')
+    return _binary_keys
+
+def reset_key_format():
+    """Forget the cached key format so binary_keys() looks it up again."""
+    global _binary_keys
+    _binary_keys = None
+
+def key_param(user_id, conn=None):
+    """Return user_id in the form the user_data key column stores it.
+
+    conn, if given, is used to look up the key format (see binary_keys()).
+    """
+    if user_id is None or not binary_keys(conn):
+        return user_id
+    return encode_key(user_id)
+
+def add_change_tracking(connection):
+    """Add the updated_at column and index to a user_data table that lacks them."""
+    cursor = connection.cursor()
+    try:
+        cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'user_data'
+              AND COLUMN_NAME = 'updated_at'
+        """)
+        if not cursor.fetchone()[0]:
+            cursor.execute("""
+                ALTER TABLE user_data
+                ADD COLUMN updated_at TIMESTAMP(6) NOT NULL
+                    DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
+                ADD INDEX updated_at_index (updated_at, user_id)
+            """)
+            connection.commit()
+            print("Added updated_at change tracking to user_data")
+    except mysql.connector.Error as err:
+        print(f"Failed adding change tracking: {err}")
+    cursor.close()
+
+INSERT_CHUNK_SIZE = 10000
+
+def insert_rows(connection, rows, chunk_size=INSERT_CHUNK_SIZE):
+    """Bulk insert (user_id, name, email, age) tuples into user_data.
+
+    user_id is given as a UUID string and stored in the table's key format.
+    Rows are sent chunk_size at a time as one multi-row INSERT IGNORE (which
+    executemany() builds for us) and committed per chunk. Rows whose email
+    already exists are skipped by the unique key rather than by a lookup.
+    Returns (rows_read, rows_inserted).
+    """
+    if binary_keys(connection):
+        rows = ((encode_key(row[0]),) + tuple(row[1:]) for row in rows)
     cursor = connection.cursor()
+    rows_read = 0
+    rows_inserted = 0
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            rows_inserted += _insert_chunk(connection, cursor, chunk)
+            rows_read += len(chunk)
+            chunk = []
+    if chunk:
+        rows_inserted += _insert_chunk(connection, cursor, chunk)
+        rows_read += len(chunk)
+    cursor.close()
+    return rows_read, rows_inserted
+
+def _insert_chunk(connection, cursor, chunk):
+    """Write one chunk of rows and commit it; return the rows inserted."""
+    cursor.executemany("""
+        INSERT IGNORE INTO user_data (user_id, name, email, age)
+        VALUES (%s, %s, %s, %s)
+    """, chunk)
+    connection.commit()
+    return max(cursor.rowcount, 0)
+
+def insert_data(connection, csv_file, chunk_size=INSERT_CHUNK_SIZE):
+    """Insert CSV data into user_data table if email doesn't exist."""
+    start = time.perf_counter()
     with open(csv_file, newline='', encoding='utf-8') as csvfile:
         reader = csv.DictReader(csvfile)
-        for row in reader:
-            # Check if email exists to avoid duplicates
-            cursor.execute("SELECT 1 FROM user_data WHERE email = %s LIMIT 1", (row['email'],))
-            if cursor.fetchone():
-                continue
-            # Generate UUID for user_id
-            user_id = str(uuid.uuid4())
-            cursor.execute("""
-                INSERT INTO user_data (user_id, name, email, age)
-                VALUES (%s, %s, %s, %s)
-            """, (user_id, row['name'], row['email'], row['age']))
-        connection.commit()
+        # Generate UUID for user_id
+        rows = (
+            (str(uuid.uuid4()), row['name'], row['email'], row['age'])
+            for row in reader
+        )
+        rows_read, rows_inserted = insert_rows(connection, rows, chunk_size)
+    elapsed = time.perf_counter() - start
+    print(f"Inserted {rows_inserted} of {rows_read} rows in {elapsed:.2f}s "
+          f"({rows_read / elapsed if elapsed else 0:.0f} rows/sec)")
+    return rows_inserted
+
+def insert_data_parallel(connection, csv_file, workers=None,
+                         chunk_size=INSERT_CHUNK_SIZE):
+    """Insert CSV data, parsing it in a process pool while rows are written.
+
+    Rows are validated on the way in (age as a number, trimmed lower-case
+    email); invalid ones are counted and skipped.
+    """
+    start = time.perf_counter()
+    rejected = 0
+
+    def parsed_rows():
+        nonlocal rejected
+        for rows, bad in csv_pipeline.parse_csv_parallel(csv_file, workers):
+            rejected += bad
+            yield from rows
+
+    rows_read, rows_inserted = insert_rows(connection, parsed_rows(), chunk_size)
+    elapsed = time.perf_counter() - start
+    print(f"Inserted {rows_inserted} of {rows_read} rows in {elapsed:.2f}s "
+          f"({rows_read / elapsed if elapsed else 0:.0f} rows/sec, "
+          f"{rejected} invalid rows skipped)")
+    return rows_inserted
+
+# Bytes before the resume offset that must be unchanged for a resume.
+_TAIL_BYTES = 64
+
+def _tail_digest(f, offset):
+    """Return a digest of the bytes just before offset in the binary file f."""
+    f.seek(max(offset - _TAIL_BYTES, 0))
+    return hashlib.sha1(f.read(min(offset, _TAIL_BYTES))).hexdigest()
+
+def _has_rows(connection):
+    """Return True if user_data holds any rows (a reset table does not)."""
+    cursor = connection.cursor()
+    cursor.execute("SELECT 1 FROM user_data LIMIT 1")
+    row = cursor.fetchone()
     cursor.close()
+    return row is not None
+
+def load_csv(connection, csv_file, state_file=None,
+             chunk_size=INSERT_CHUNK_SIZE):
+    """Load the rows of csv_file that earlier loads have not seen.
+
+    The byte offset reached is saved to state_file (csv_file + '.seed.json'
+    by default) after every committed chunk, so a later run only reads the
+    rows appended since, and an interrupted run resumes where it stopped. If
+    the file was rewritten rather than appended to, it is read from the top
+    again, as it is when user_data is empty; the unique email key makes that
+    idempotent. Rows are validated as in insert_data_parallel(). Append whole
+    lines only: a half-written last line would be loaded as it is.
+    Returns (rows_read, rows_inserted, rows_rejected).
+    """
+    state_file = state_file or f"{csv_file}.seed.json"
+    state = checkpoint.load_checkpoint(state_file)
+    rows_read = rows_inserted = rejected = 0
+    with open(csv_file, 'rb') as f:
+        header = f.readline()
+        fieldnames = next(csv.reader([header.decode('utf-8')]))
+        offset = f.tell()
+        saved = state.get('offset', 0)
+        if (offset < saved <= os.path.getsize(csv_file)
+                and _tail_digest(f, saved) == state.get('tail')
+                and _has_rows(connection)):
+            offset = saved
+        f.seek(offset)
+        while True:
+            lines = []
+            for line in f:
+                lines.append(line)
+                if len(lines) >= chunk_size:
+                    break
+            if not lines:
+                break
+            offset += sum(map(len, lines))
+            reader = csv.DictReader(
+                io.StringIO(b''.join(lines).decode('utf-8')),
+                fieldnames=fieldnames)
+            rows = []
+            for record in reader:
+                row = csv_pipeline.parse_row(record)
+                if row is None:
+                    rejected += 1
+                else:
+                    rows.append(row)
+            read, inserted = insert_rows(connection, rows, chunk_size)
+            rows_read += read
+            rows_inserted += inserted
+            checkpoint.save_checkpoint(state_file, {
+                'offset': offset, 'tail': _tail_digest(f, offset)})
+            f.seek(offset)
+    return rows_read, rows_inserted, rejected
+
+def stream_user_data(connection, row_mode='dict'):
+    """Generator that yields rows one by one from user_data.
 
-def stream_user_data(connection):
-    """Generator that yields rows one by one from user_data."""
-    cursor = connection.cursor(dictionary=True)
+    row_mode='tuple' yields compact namedtuple rows instead of dicts.
+    """
+    cursor = make_cursor(connection, row_mode)
     cursor.execute("SELECT * FROM user_data")
-    for row in cursor:
+    for row in iter_rows(cursor, row_mode):
         yield row
     cursor.close()
 
-connection = connect_to_prodev()
-if connection:
-    create_table(connection)
-    insert_data(connection, 'user_data.csv') 
+def main(argv=None):
+    """Create the database and table and load a CSV file into user_data."""
+    parser = argparse.ArgumentParser(
+        description="Seed the ALX_prodev user_data table from a CSV file.")
+    parser.add_argument('csv_file', nargs='?', default='user_data.csv')
+    parser.add_argument('--full', action='store_true',
+                        help="read the whole file, ignoring the saved offset")
+    parser.add_argument('--parallel', action='store_true',
+                        help="full load, parsing in a process pool")
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--chunk-size', type=int, default=INSERT_CHUNK_SIZE)
+    parser.add_argument('--state-file',
+                        help="offset file (default: CSV_FILE.seed.json)")
+    parser.add_argument('--binary-keys', action='store_true',
+                        help="store user_id as BINARY(16) in a new table")
+    args = parser.parse_args(argv)
+
+    server = connect_db()
+    if not server:
+        return 1
+    create_database(server)
+    server.close()
+    connection = connect_to_prodev()
+    if not connection:
+        return 1
+    create_table(connection, binary_keys=args.binary_keys)
+    add_change_tracking(connection)
+
+    if args.parallel:
+        insert_data_parallel(connection, args.csv_file, args.workers,
+                             args.chunk_size)
+    else:
+        state_file = args.state_file or f"{args.csv_file}.seed.json"
+        if args.full:
+            checkpoint.clear_checkpoint(state_file)
+        start = time.perf_counter()
+        rows_read, rows_inserted, rejected = load_csv(
+            connection, args.csv_file, state_file, args.chunk_size)
+        elapsed = time.perf_counter() - start
+        print(f"Inserted {rows_inserted} of {rows_read} new rows in "
+              f"{elapsed:.2f}s ({rejected} invalid rows skipped)")
+    connection.close()
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,188 @@
+"""Columnar on-disk snapshots of user_data, read back through mmap.
+
+export_snapshot() streams user_data out of MySQL once and writes it as one
+file with a block per column:
+
+    user_id  16-byte UUIDs
+    name     int64 offsets + UTF-8 data
+    email    int64 offsets + UTF-8 data
+    age      float64
+
+Snapshot memory-maps that file and hands out zero-copy memoryviews of the
+columns, so repeated scans are served from the page cache instead of over
+the database protocol. stream_users() and stream_users_in_batches() mirror
+the generators of the same name.
+"""
+import json
+import mmap
+import os
+import struct
+import tempfile
+from array import array
+
+from columnar import ColumnBatch, StringColumn, UUIDColumn
+from keys import encode_key
+
+MAGIC = b'UDSNAP1\n'
+COLUMNS = ('user_id', 'name', 'email', 'age')
+STRING_COLUMNS = ('name', 'email')
+_ALIGN = 8
+
+
+def _pad(f):
+    """Pad file f with zero bytes up to the next 8-byte boundary."""
+    remainder = f.tell() % _ALIGN
+    if remainder:
+        f.write(b'\0' * (_ALIGN - remainder))
+
+
+def export_snapshot(path, batch_size=10000, where=None):
+    """Write user_data (optionally filtered by a query predicate) to path.
+
+    Rows are streamed in key order and spooled per column, so memory use
+    does not depend on the table size. The file is replaced atomically,
+    and only once every row has been read: a database error propagates and
+    leaves any existing snapshot in place. Returns the number of rows
+    written.
+    """
+    stream_users_in_batches = __import__('1-batch_processing').stream_users_in_batches
+    directory = os.path.dirname(os.path.abspath(path))
+    spools = {
+        name: tempfile.TemporaryFile(dir=directory)
+        for name in ('user_id', 'age') + tuple(
+            f'{name}.{part}' for name in STRING_COLUMNS
+            for part in ('offsets', 'data'))
+    }
+    try:
+        rows = 0
+        ends = {name: 0 for name in STRING_COLUMNS}
+        for name in STRING_COLUMNS:
+            spools[f'{name}.offsets'].write(array('q', [0]).tobytes())
+        # A failed read must raise: a stream that just stopped early would
+        # replace a good snapshot with a truncated one.
+        for batch in stream_users_in_batches(batch_size, keyset=True,
+                                             columns=COLUMNS, where=where,
+                                             columnar=True, raise_errors=True):
+            rows += len(batch)
+            spools['user_id'].write(b''.join(map(encode_key, batch['user_id'])))
+            spools['age'].write(batch['age'].tobytes())
+            for name in STRING_COLUMNS:
+                column = batch[name]
+                base = ends[name]
+                spools[f'{name}.offsets'].write(
+                    array('q', (base + offset for offset in column.offsets[1:])).tobytes())
+                spools[f'{name}.data'].write(column.data)
+                ends[name] = base + len(column.data)
+
+        layout = {}
+        position = 0
+        for name in spools:
+            length = spools[name].tell()
+            layout[name] = {'offset': position, 'length': length}
+            position += -(-length // _ALIGN) * _ALIGN
+        header = json.dumps({'rows': rows, 'blocks': layout}).encode('utf-8')
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as out:
+            out.write(MAGIC)
+            out.write(struct.pack('<Q', len(header)))
+            out.write(header)
+            _pad(out)
+            for name, spool in spools.items():
+                spool.seek(0)
+                while True:
+                    chunk = spool.read(1 << 20)
+                    if not chunk:
+                        break
+                    out.write(chunk)
+                _pad(out)
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp_path, path)
+        return rows
+    finally:
+        for spool in spools.values():
+            spool.close()
+
+
+class Snapshot:
+    """A memory-mapped snapshot file; use as a context manager."""
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._map)
+        if bytes(view[:len(MAGIC)]) != MAGIC:
+            view.release()
+            self.close()
+            raise ValueError(f"{path} is not a user_data snapshot")
+        (header_length,) = struct.unpack_from('<Q', self._map, len(MAGIC))
+        header_start = len(MAGIC) + 8
+        header = json.loads(bytes(view[header_start:header_start + header_length]))
+        data_start = -(-(header_start + header_length) // _ALIGN) * _ALIGN
+        self.rows = header['rows']
+        self._blocks = {
+            name: view[data_start + block['offset']:
+                       data_start + block['offset'] + block['length']]
+            for name, block in header['blocks'].items()
+        }
+        view.release()
+
+    def __len__(self):
+        return self.rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    def close(self):
+        """Unmap the file once no column view is still in use."""
+        for block in getattr(self, '_blocks', {}).values():
+            block.release()
+        self._blocks = {}
+        try:
+            self._map.close()
+        except BufferError:
+            # Views handed out are still alive; the mapping is released
+            # when the last of them goes away.
+            pass
+        self._file.close()
+
+    def column(self, name, start=0, stop=None):
+        """Return a zero-copy view of rows [start, stop) of column name."""
+        stop = self.rows if stop is None else min(stop, self.rows)
+        if name == 'user_id':
+            return UUIDColumn(self._blocks['user_id'][start * 16:stop * 16])
+        if name == 'age':
+            return self._blocks['age'].cast('d')[start:stop]
+        if name in STRING_COLUMNS:
+            offsets = self._blocks[f'{name}.offsets'].cast('q')[start:stop + 1]
+            return StringColumn(self._blocks[f'{name}.data'][:], offsets)
+        raise KeyError(name)
+
+    def batch(self, start, stop, columns=COLUMNS):
+        """Return rows [start, stop) as a ColumnBatch of zero-copy views."""
+        return ColumnBatch({name: self.column(name, start, stop)
+                            for name in columns})
+
+
+def stream_users_in_batches(path, batch_size, columnar=False, columns=COLUMNS):
+    """Generator of batches read from a snapshot file.
+
+    Batches are lists of dicts, like 1-batch_processing's generator, or with
+    columnar=True ColumnBatch objects whose columns are views into the
+    mapped file.
+    """
+    with Snapshot(path) as snapshot:
+        for start in range(0, len(snapshot), batch_size):
+            batch = snapshot.batch(start, start + batch_size, columns)
+            yield batch if columnar else list(batch.rows())
+
+
+def stream_users(path, batch_size=10000):
+    """Generator that yields the rows of a snapshot file one by one as dicts."""
+    for batch in stream_users_in_batches(path, batch_size):
+        yield from batch
@@ -0,0 +1,197 @@
+"""One-pass, constant-memory statistics over batches of numbers.
+
+Each accumulator consumes whole batches (lists of floats) so most per-value
+work happens inside builtins such as sum(), min() and map() rather than in a
+Python loop, and accumulators built on different streams can be merged.
+"""
+import math
+import operator
+from bisect import bisect_left
+from collections import Counter
+
+
+class RunningStats:
+    """Count, mean, variance, min and max, merged batch by batch (Chan et al.)."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, values):
+        n = len(values)
+        if not n:
+            return
+        total = math.fsum(values)
+        batch_mean = total / n
+        squares = math.fsum(map(operator.mul, values, values))
+        batch_m2 = max(squares - total * batch_mean, 0.0)
+        self._combine(n, batch_mean, batch_m2, min(values), max(values))
+
+    def merge(self, other):
+        if other.count:
+            self._combine(other.count, other.mean, other._m2,
+                          other.min, other.max)
+
+    def _combine(self, n, mean, m2, low, high):
+        count = self.count + n
+        delta = mean - self.mean
+        self.mean += delta * n / count
+        self._m2 += m2 + delta * delta * self.count * n / count
+        self.count = count
+        self.min = min(self.min, low)
+        self.max = max(self.max, high)
+
+    @property
+    def variance(self):
+        """Population variance (matches SQL VAR_POP)."""
+        return self._m2 / self.count if self.count else math.nan
+
+
+class Histogram:
+    """Fixed-width bins keyed by their lower bound."""
+
+    def __init__(self, bin_width=10):
+        self.bin_width = bin_width
+        self.counts = Counter()
+
+    def update(self, values):
+        width = self.bin_width
+        self.counts.update(map(lambda value: value // width * width, values))
+
+    def merge(self, other):
+        self.counts.update(other.counts)
+
+    def bins(self):
+        return dict(sorted(self.counts.items()))
+
+
+class TDigest:
+    """Merging t-digest for approximate quantiles in bounded memory.
+
+    Values are buffered and periodically merged into at most about
+    `compression` centroids, which are kept small near the tails so extreme
+    quantiles stay accurate.
+    """
+
+    def __init__(self, compression=100):
+        self.compression = compression
+        self._means = []
+        self._weights = []
+        self._buffer = []
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, values):
+        if not values:
+            return
+        self._buffer.extend(values)
+        self.min = min(self.min, min(values))
+        self.max = max(self.max, max(values))
+        if len(self._buffer) >= self.compression * 20:
+            self._compress()
+
+    def merge(self, other):
+        other._compress()
+        self._compress()
+        if other._means:
+            self._buffer = list(other._means)
+            self._compress(weights=other._weights)
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def _scale(self, q):
+        return self.compression / (2 * math.pi) * math.asin(2 * q - 1)
+
+    def _compress(self, weights=None):
+        if not self._buffer:
+            return
+        if weights is None:
+            weights = [1.0] * len(self._buffer)
+        points = sorted(zip(self._means + self._buffer,
+                            self._weights + list(weights)))
+        self._buffer = []
+        total = math.fsum(weight for _, weight in points)
+        means = []
+        centroid_weights = []
+        mean, weight = points[0]
+        before = 0.0
+        k_low = self._scale(0.0)
+        for next_mean, next_weight in points[1:]:
+            q_high = min((before + weight + next_weight) / total, 1.0)
+            if self._scale(q_high) - k_low <= 1:
+                weight += next_weight
+                mean += (next_mean - mean) * next_weight / weight
+            else:
+                means.append(mean)
+                centroid_weights.append(weight)
+                before += weight
+                k_low = self._scale(before / total)
+                mean, weight = next_mean, next_weight
+        means.append(mean)
+        centroid_weights.append(weight)
+        self._means = means
+        self._weights = centroid_weights
+
+    def quantile(self, q):
+        """Estimate the q-th quantile (0 <= q <= 1)."""
+        self._compress()
+        if not self._means:
+            return math.nan
+        if len(self._means) == 1:
+            return self._means[0]
+        total = math.fsum(self._weights)
+        target = q * total
+        # Cumulative weight at each centroid's centre.
+        centres = []
+        running = 0.0
+        for weight in self._weights:
+            centres.append(running + weight / 2)
+            running += weight
+        if target <= centres[0]:
+            return self.min + (self._means[0] - self.min) * (
+                target / centres[0] if centres[0] else 0)
+        if target >= centres[-1]:
+            tail = total - centres[-1]
+            return self._means[-1] + (self.max - self._means[-1]) * (
+                (target - centres[-1]) / tail if tail else 0)
+        i = bisect_left(centres, target)
+        low, high = centres[i - 1], centres[i]
+        fraction = (target - low) / (high - low)
+        return self._means[i - 1] + (self._means[i] - self._means[i - 1]) * fraction
+
+
+class StreamStats:
+    """Running stats, a histogram and a t-digest fed from the same batches."""
+
+    def __init__(self, bin_width=10, compression=100,
+                 quantiles=(0.25, 0.5, 0.75, 0.9, 0.99)):
+        self.quantiles = quantiles
+        self.running = RunningStats()
+        self.histogram = Histogram(bin_width)
+        self.digest = TDigest(compression)
+
+    def update(self, values):
+        self.running.update(values)
+        self.histogram.update(values)
+        self.digest.update(values)
+
+    def merge(self, other):
+        self.running.merge(other.running)
+        self.histogram.merge(other.histogram)
+        self.digest.merge(other.digest)
+
+    def summary(self):
+        running = self.running
+        return {
+            'count': running.count,
+            'mean': running.mean if running.count else math.nan,
+            'variance': running.variance,
+            'stddev': math.sqrt(running.variance) if running.count else math.nan,
+            'min': running.min if running.count else math.nan,
+            'max': running.max if running.count else math.nan,
+            'histogram': self.histogram.bins(),
+            'quantiles': {q: self.digest.quantile(q) for q in self.quantiles},
+        }
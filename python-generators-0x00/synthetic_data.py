@@ -0,0 +1,132 @@
+"""Reproducible synthetic user_data for load testing.
+
+Rows are generated a batch at a time: one getrandbits() call provides the
+UUIDs of a whole batch and random.choices() draws all names and ages at
+once, so generation runs at several hundred thousand rows per second, well
+ahead of what the bulk insert path can absorb. The same random_seed always
+gives the same rows, and every email is unique (it embeds the row number),
+so a dataset loads in full through INSERT IGNORE.
+
+Usage: python synthetic_data.py ROWS [--csv PATH] [--db [--truncate]]
+                                     [--random-seed N]
+"""
+import argparse
+import csv
+import random
+import time
+
+import seed
+
+BATCH_SIZE = 100000
+FIRST_NAMES = (
+    'Alice', 'Bongani', 'Chen', 'Dalia', 'Emeka', 'Fatima', 'Gustavo', 'Hana',
+    'Ibrahim', 'Jules', 'Kwame', 'Leila', 'Mateo', 'Nadia', 'Oluwaseun',
+    'Priya', 'Quentin', 'Rosa', 'Samir', 'Thandiwe', 'Umar', 'Valentina',
+    'Wanjiru', 'Xavier', 'Yusuf', 'Zanele',
+)
+LAST_NAMES = (
+    'Abebe', 'Banda', 'Cohen', 'Diallo', 'Eze', 'Fernandes', 'Garcia', 'Haddad',
+    'Ito', 'Jensen', 'Kamau', 'Lopez', 'Mensah', 'Nguyen', 'Okafor', 'Patel',
+    'Quispe', 'Rossi', 'Smith', 'Tanaka', 'Uwimana', 'Varga', 'Wright',
+    'Xu', 'Yilmaz', 'Zulu',
+)
+DOMAINS = ('example.com', 'example.org', 'example.net', 'mail.test')
+AGES = range(18, 100)
+# Variant bits of a random UUID (10xx) for each value of a hex digit.
+_VARIANT = dict(zip('0123456789abcdef', '89ab' * 4))
+# Every (name, email local part, @domain) combination, drawn with one call.
+_PEOPLE = [
+    (f"{first} {last}", f"{first.lower()}.{last.lower()}", f"@{domain}")
+    for first in FIRST_NAMES for last in LAST_NAMES for domain in DOMAINS
+]
+
+
+def uuid_strings(rng, count):
+    """Return count random version 4 UUID strings from one getrandbits()."""
+    digits = rng.getrandbits(128 * count).to_bytes(16 * count, 'big').hex()
+    variant = _VARIANT
+    return [
+        f"{digits[i:i + 8]}-{digits[i + 8:i + 12]}-4{digits[i + 13:i + 16]}-"
+        f"{variant[digits[i + 16]]}{digits[i + 17:i + 20]}-{digits[i + 20:i + 32]}"
+        for i in range(0, 32 * count, 32)
+    ]
+
+
+def synthetic_batches(count, random_seed=0, batch_size=BATCH_SIZE):
+    """Generator of lists of (user_id, name, email, age) tuples, count in all."""
+    rng = random.Random(random_seed)
+    for start in range(0, count, batch_size):
+        size = min(batch_size, count - start)
+        people = rng.choices(_PEOPLE, k=size)
+        ages = rng.choices(AGES, k=size)
+        yield [
+            (user_id, name, f"{local}{number}{domain}", age)
+            for user_id, (name, local, domain), age, number in zip(
+                uuid_strings(rng, size), people, ages,
+                range(start, start + size))
+        ]
+
+
+def synthetic_rows(count, random_seed=0):
+    """Generator of count reproducible (user_id, name, email, age) rows."""
+    for batch in synthetic_batches(count, random_seed):
+        yield from batch
+
+
+def write_csv(path, count, random_seed=0):
+    """Write count rows to path in the layout of user_data.csv."""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_ALL)
+        writer.writerow(('name', 'email', 'age'))
+        for batch in synthetic_batches(count, random_seed):
+            writer.writerows(row[1:] for row in batch)
+
+
+def load_database(count, random_seed=0, truncate=False):
+    """Insert count rows into user_data through seed.insert_rows().
+
+    With truncate=True the table is emptied first. Returns (rows_read,
+    rows_inserted).
+    """
+    with seed.pooled_connection() as conn:
+        if truncate:
+            cursor = conn.cursor()
+            cursor.execute("TRUNCATE TABLE user_data")
+            cursor.close()
+        return seed.insert_rows(conn, synthetic_rows(count, random_seed))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('rows', type=int)
+    parser.add_argument('--csv', help="write the rows to this CSV file")
+    parser.add_argument('--db', action='store_true',
+                        help="insert the rows into user_data")
+    parser.add_argument('--truncate', action='store_true',
+                        help="empty user_data before inserting")
+    parser.add_argument('--random-seed', type=int, default=0)
+    args = parser.parse_args()
+    if not args.csv and not args.db:
+        # Generate only, to time the generator itself.
+        start = time.perf_counter()
+        for _ in synthetic_batches(args.rows, args.random_seed):
+            pass
+        elapsed = time.perf_counter() - start
+        print(f"Generated {args.rows} rows in {elapsed:.2f}s "
+              f"({args.rows / elapsed if elapsed else 0:.0f} rows/sec)")
+    if args.csv:
+        start = time.perf_counter()
+        write_csv(args.csv, args.rows, args.random_seed)
+        print(f"Wrote {args.rows} rows to {args.csv} in "
+              f"{time.perf_counter() - start:.2f}s")
+    if args.db:
+        start = time.perf_counter()
+        rows_read, rows_inserted = load_database(args.rows, args.random_seed,
+                                                 args.truncate)
+        elapsed = time.perf_counter() - start
+        print(f"Inserted {rows_inserted} of {rows_read} rows in {elapsed:.2f}s "
+              f"({rows_read / elapsed if elapsed else 0:.0f} rows/sec)")
+
+
+if __name__ == "__main__":
+    main()